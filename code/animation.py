@@ -0,0 +1,31 @@
+from settings import *
+
+class AnimationClock:
+	# one clock per frame list, every tile showing those frames reads the same image
+	def __init__(self, frames, speed = ANIMATION_SPEED):
+		self.frames = frames
+		self.speed = speed
+		self.frame_index = 0
+		self.image = frames[0]
+
+	def update(self, dt):
+		self.frame_index += self.speed * dt
+		self.image = self.frames[int(self.frame_index % len(self.frames))]
+
+class AnimationClocks:
+	def __init__(self):
+		self.clocks = {}
+
+	def get(self, frames):
+		# frame lists are shared through overworld_frames, so the list identity is the key
+		clock = self.clocks.get(id(frames))
+		if clock is None:
+			clock = self.clocks[id(frames)] = AnimationClock(frames)
+		return clock
+
+	def update(self, dt):
+		for clock in self.clocks.values():
+			clock.update(dt)
+
+	def __len__(self):
+		return len(self.clocks)
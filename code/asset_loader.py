@@ -0,0 +1,95 @@
+from settings import *
+from os import walk
+from concurrent.futures import ThreadPoolExecutor
+from asset_pack import asset_key
+from map_compiler import atlas_image
+
+# worker side: only raw pixels and parsing, no display needed
+def decode_image(path):
+	surf = pygame.image.load(path)
+	return surf.get_size(), pygame.image.tobytes(surf, 'RGBA')
+
+# pytmx is only needed for maps that map_compiler.py has not compiled
+def parse_tmx(path):
+	from pytmx import TiledMap
+	return TiledMap(path)
+
+def parse_tmx_atlas(path):
+	# tiles are only recorded, the tileset images are decoded here so the main thread just has to convert
+	from pytmx import TiledMap
+	from map_compiler import atlas_loader
+	tmx_map = TiledMap(path, image_loader = atlas_loader)
+	sources = {entry[0]: decode_image(entry[0]) for entry in tmx_map.images if entry}
+	return tmx_map, sources
+
+def load_tmx(path):
+	# tiles are converted to the display format, so this only runs once the window exists
+	from pytmx.util_pygame import load_pygame
+	return load_pygame(path)
+
+class AssetDecoder:
+	def __init__(self, workers = LOADER_WORKERS):
+		self.pool = ThreadPoolExecutor(workers, thread_name_prefix = 'asset-decoder')
+		self.images = {}
+		self.maps = {}
+
+	def submit_images(self, *path, skip = None):
+		# a single png or every png in a folder
+		full_path = join(*path)
+		files = [full_path] if full_path.endswith('.png') else [join(folder_path, file_name) for folder_path, _, file_names in walk(full_path) for file_name in file_names]
+		for file_path in files:
+			key = asset_key(file_path)
+			if key.endswith('.png') and not (skip and skip(key)):
+				self.images[key] = self.pool.submit(decode_image, key)
+
+	def submit_map(self, *path, atlas = False):
+		# tiles are not loaded here, tmx() or tmx_batches() convert them on the main thread
+		key = asset_key(join(*path))
+		self.maps[key] = self.pool.submit(parse_tmx_atlas if atlas else parse_tmx, key)
+
+	# main thread side: turn the decoded data into surfaces once the display exists
+	def image(self, path):
+		future = self.images.pop(asset_key(path), None)
+		if future is None:
+			return None
+		size, data = future.result()
+		return pygame.image.frombuffer(data, size, 'RGBA')
+
+	def ready(self, path):
+		future = self.maps.get(asset_key(path)) or self.images.get(asset_key(path))
+		return future is None or future.done()
+
+	def tmx(self, path):
+		future = self.maps.pop(asset_key(path), None)
+		if future is None:
+			return None
+		tmx_map = future.result()
+		from pytmx.util_pygame import pygame_image_loader
+		if tmx_map.image_loader is not pygame_image_loader:
+			tmx_map.image_loader = pygame_image_loader
+			tmx_map.reload_images()
+		return tmx_map
+
+	def tmx_batches(self, path, batch_pixels = PREFETCH_SLICE_PIXELS):
+		# generator for maps submitted with atlas = True, converts tiles until a batch of pixels is done per step and returns the map
+		tmx_map, decoded = self.maps.pop(asset_key(path)).result()
+		sources = {}
+		load_source = lambda source: pygame.image.frombuffer(decoded[source][1], decoded[source][0], 'RGBA')
+		pixels = 0
+		for gid, entry in enumerate(tmx_map.images):
+			if not entry:
+				continue
+			# big object images count for more than a tile, so they get a step of their own
+			if pixels >= batch_pixels:
+				pixels = 0
+				yield
+			tmx_map.images[gid] = atlas_image(entry, sources, load_source)
+			pixels += tmx_map.images[gid].get_width() * tmx_map.images[gid].get_height()
+		return tmx_map
+
+	def shutdown(self):
+		for futures in (self.images, self.maps):
+			for future in futures.values():
+				future.cancel()
+			futures.clear()
+		self.pool.shutdown(wait = False)
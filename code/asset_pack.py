@@ -0,0 +1,152 @@
+from settings import *
+from os.path import join, exists, normpath, dirname
+from os import walk, makedirs, sep
+import hashlib
+import json
+import mmap
+import struct
+import sys
+
+# pack layout: magic, header length, json header, padding, raw pixel data
+PACK_MAGIC = b'MH7PACK1'
+PACK_ALIGN = 16
+
+# sprite sheets that the importers cut into cells, by file or by folder
+TILEMAP_SPECS = {
+	'graphics/tilesets/coast.png': (24, 12),
+	'graphics/characters': (4, 4),
+	'graphics/monsters': (4, 2),
+	'graphics/attacks': (4, 1),
+}
+
+def asset_key(path):
+	return normpath(path).replace(sep, '/')
+
+def source_files(root = 'graphics'):
+	files = []
+	for folder_path, _, file_names in walk(root):
+		for file_name in file_names:
+			if file_name.endswith('.png'):
+				files.append(asset_key(join(folder_path, file_name)))
+	return sorted(files)
+
+def source_hash(files):
+	sha = hashlib.sha1(PACK_MAGIC)
+	for file in files:
+		sha.update(file.encode())
+		with open(file, 'rb') as f:
+			sha.update(f.read())
+	return sha.hexdigest()
+
+def tilemap_spec(key):
+	if key in TILEMAP_SPECS:
+		return TILEMAP_SPECS[key]
+	return TILEMAP_SPECS.get(key.rsplit('/', 1)[0])
+
+def cut_tilemap(surf, cols, rows):
+	# same cutting as support.import_tilemap, kept in sync so packed cells are pixel identical
+	cells = {}
+	cell_width, cell_height = surf.get_width() / cols, surf.get_height() / rows
+	for col in range(cols):
+		for row in range(rows):
+			cutout_rect = pygame.Rect(col * cell_width, row * cell_height, cell_width, cell_height)
+			cutout_surf = pygame.Surface((cell_width, cell_height))
+			cutout_surf.fill('green')
+			cutout_surf.set_colorkey('green')
+			cutout_surf.blit(surf, (0,0), cutout_rect)
+			cells[(col, row)] = cutout_surf
+	return cells
+
+def build_asset_pack(pack_path = ASSET_PACK_PATH, force = False):
+	files = source_files()
+	digest = source_hash(files)
+	if not force and exists(pack_path) and read_header(pack_path).get('hash') == digest:
+		print(f'[INFO] Asset pack {pack_path} is up to date')
+		return False
+
+	entries, tilemaps, chunks = {}, {}, []
+	offset = 0
+
+	def add(surf, format):
+		nonlocal offset
+		data = pygame.image.tobytes(surf, format)
+		entry = [offset, surf.get_width(), surf.get_height(), format]
+		chunks.append(data + bytes(-len(data) % PACK_ALIGN))
+		offset += len(chunks[-1])
+		return entry
+
+	for key in files:
+		surf = pygame.image.load(key)
+		spec = tilemap_spec(key)
+		if spec:
+			# sheets are only ever used cut up, so only the cells are stored
+			cells = cut_tilemap(surf, *spec)
+			tilemaps[f'{key}@{spec[0]}x{spec[1]}'] = [[col, row, *add(cell, 'RGB')] for (col, row), cell in cells.items()]
+		else:
+			entries[key] = add(surf, 'RGBA')
+
+	header = json.dumps({'hash': digest, 'images': entries, 'tilemaps': tilemaps}).encode()
+	prefix = PACK_MAGIC + struct.pack('<I', len(header)) + header
+	prefix += bytes(-len(prefix) % PACK_ALIGN)
+
+	makedirs(dirname(pack_path) or '.', exist_ok = True)
+	with open(pack_path, 'wb') as f:
+		f.write(prefix)
+		for chunk in chunks:
+			f.write(chunk)
+	print(f'[INFO] Wrote asset pack {pack_path} ({len(entries)} images, {len(tilemaps)} sheets, {(len(prefix) + offset) / 2**20:.1f} MB)')
+	return True
+
+def read_header(pack_path):
+	with open(pack_path, 'rb') as f:
+		if f.read(len(PACK_MAGIC)) != PACK_MAGIC:
+			return {}
+		length = struct.unpack('<I', f.read(4))[0]
+		return json.loads(f.read(length))
+
+class AssetPack:
+	def __init__(self, pack_path, header):
+		self.header = header
+		self.file = open(pack_path, 'rb')
+		self.buffer = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+		self.view = memoryview(self.buffer)
+		prefix = len(PACK_MAGIC) + 4 + struct.unpack_from('<I', self.buffer, len(PACK_MAGIC))[0]
+		self.data_start = prefix + (-prefix % PACK_ALIGN)
+		self.sheets = {key.split('@')[0] for key in header['tilemaps']}
+
+	@classmethod
+	def open(cls, pack_path = ASSET_PACK_PATH):
+		if not exists(pack_path):
+			return None
+		header = read_header(pack_path)
+		if header.get('hash') != source_hash(source_files()):
+			print(f'[WARNING] Asset pack {pack_path} is stale, decoding sources instead (run python code/asset_pack.py)')
+			return None
+		return cls(pack_path, header)
+
+	def surface(self, offset, width, height, format):
+		start = self.data_start + offset
+		size = width * height * len(format)
+		return pygame.image.frombuffer(self.view[start:start + size], (width, height), format)
+
+	def covers(self, path):
+		key = asset_key(path)
+		return key in self.header['images'] or key in self.sheets
+
+	def image(self, path):
+		entry = self.header['images'].get(asset_key(path))
+		return self.surface(*entry) if entry else None
+
+	def tilemap(self, path, cols, rows):
+		cells = self.header['tilemaps'].get(f'{asset_key(path)}@{cols}x{rows}')
+		if cells is None:
+			return None
+		frames = {}
+		for col, row, *entry in cells:
+			surf = self.surface(*entry).convert()
+			surf.set_colorkey('green')
+			frames[(col, row)] = surf
+		return frames
+
+if __name__ == '__main__':
+	build_asset_pack(force = '--force' in sys.argv)
@@ -1,10 +1,10 @@
 from settings import * 
 from sprite import MonsterSprite, MonsterNameSprite, MonsterLevelSprite, MonsterStatsSprite, MonsterOutlineSprite, AttackSprite, TimedSprite
 from groups import BattleSprites
-from game_data import ATTACK_DATA
+from data_tables import ELEMENTS, get_attack
+from battle_engine import BattleEngine, Action
 from support import draw_bar
 from timer import Timer
-from random import choice
 
 class Battle:
 	# main
@@ -14,7 +14,7 @@ class Battle:
 		self.bg_surf = bg_surf
 		self.monster_frames = monster_frames
 		self.fonts = fonts
-		self.monster_data = {'player': player_monsters, 'opponent': opponent_monsters}
+		self.engine = BattleEngine(player_monsters, opponent_monsters)
 		self.battle_over = False
 		self.end_battle = end_battle
 		self.character = character
@@ -46,16 +46,11 @@ class Battle:
 		self.setup()
 
 	def setup(self):
-		for entity, monster in self.monster_data.items():
-			for index, monster in {k:v for k,v in monster.items() if k <= 2}.items():
-				self.create_monster(monster, index, index, entity)
-
-			# remove opponent monster data 
-			for i in range(len(self.opponent_sprites)):
-				del self.monster_data['opponent'][i]
+		for entity, field in self.engine.field.items():
+			for pos_index, (index, monster) in field.items():
+				self.create_monster(monster, index, pos_index, entity)
 
 	def create_monster(self, monster, index, pos_index, entity):
-		monster.paused = False
 		frames = self.monster_frames['monsters'][monster.name]
 		outline_frames = self.monster_frames['outlines'][monster.name]
 		if entity == 'player':
@@ -100,10 +95,11 @@ class Battle:
 			if keys[pygame.K_SPACE]:
 				if self.selection_mode == 'switch':
 					index, new_monster = list(self.available_monsters.items())[self.indexes['switch']]
+					events = self.engine.step(Action('switch', index = index))
 					self.current_monster.kill()
 					self.create_monster(new_monster, index, self.current_monster.pos_index, 'player')
+					self.show_events(events)
 					self.selection_mode = None
-					self.update_all_monsters('resume')
 
 				if self.selection_mode == 'target':
 					sprite_group = self.opponent_sprites if self.selection_side == 'opponent' else self.player_sprites
@@ -114,25 +110,25 @@ class Battle:
 						self.current_monster.activate_attack(monster_sprite, self.selected_attack)  # Apply the attack
 						self.selected_attack, self.current_monster, self.selection_mode = None, None, None
 					else:
-						if monster_sprite.monster.health < monster_sprite.monster.get_stat('max_health') * 0.9:
-							self.monster_data['player'][len(self.monster_data['player'])] = monster_sprite.monster
+						events = self.engine.step(Action('catch', monster_sprite.monster))
+						if events and events[0][0] == 'caught':
 							monster_sprite.delayed_kill(None)
-							self.update_all_monsters('resume')
+							self.show_events(events)
+							self.selected_attack, self.current_monster, self.selection_mode = None, None, None
 						else:
 							TimedSprite(monster_sprite.rect.center, self.monster_frames['ui']['cross'], self.battle_sprites, 1000)
 
 				if self.selection_mode == 'attacks':
 					self.selection_mode = 'target'
 					self.selected_attack = self.current_monster.monster.get_abilities(all=False)[self.indexes['attacks']]
-					self.selection_side = ATTACK_DATA[self.selected_attack]['target']
+					self.selection_side = get_attack(self.selected_attack).target
 
 				if self.selection_mode == 'general':
 					if self.indexes['general'] == 0:
 						self.selection_mode = 'attacks'
 					
 					if self.indexes['general'] == 1:
-						self.current_monster.monster.defending = True
-						self.update_all_monsters('resume')
+						self.show_events(self.engine.step(Action('defend')))
 						self.current_monster, self.selection_mode = None, None
 						self.indexes['general'] = 0
 					
@@ -152,112 +148,53 @@ class Battle:
 			timer.update()
 
 	# battle system
-	def check_active(self):
+	def sprite(self, monster):
 		for monster_sprite in self.player_sprites.sprites() + self.opponent_sprites.sprites():
-			if monster_sprite.monster.initiative >= 100:
-				monster_sprite.monster.defending = False
-				self.update_all_monsters('pause')
-				monster_sprite.monster.initiative = 0
-				monster_sprite.set_highlight(True)
-				self.current_monster = monster_sprite
-				if self.player_sprites in monster_sprite.groups():
-					self.selection_mode = 'general'
-				else:
-					self.timers['opponent delay'].activate()
-
-	def update_all_monsters(self, option):
-		for monster_sprite in self.player_sprites.sprites() + self.opponent_sprites.sprites():
-			monster_sprite.monster.paused = True if option == 'pause' else False
-
-	def apply_attack(self, target_sprite, attack, amount):
-		AttackSprite(target_sprite.rect.center, self.monster_frames['attacks'][ATTACK_DATA[attack]['animation']], self.battle_sprites)
-		self.sounds[ATTACK_DATA[attack]['animation']].play()
-
-		# Get the attack and target elements
-		attack_element = ATTACK_DATA[attack]['element']
-		target_element = target_sprite.monster.element
-
-		# Double attack logic (for elemental interactions like fire vs plant, etc.)
-		if attack_element == 'fire' and target_element == 'plant' or \
-		attack_element == 'water' and target_element == 'fire' or \
-		attack_element == 'plant' and target_element == 'water' or \
-		attack_element == 'almighty' and target_element != 'almighty':
-			amount *= 2  # Double damage
-
-		# Halve attack logic (for elemental interactions like fire vs water, etc.)
-		if attack_element == 'fire' and target_element == 'water' or \
-		attack_element == 'water' and target_element == 'plant' or \
-		attack_element == 'plant' and target_element == 'fire' or \
-		attack_element != 'almighty' and target_element == 'almighty':
-			amount *= 0.5  # Halve damage
-
-		# If the move targets 'all_opponents', apply the attack to all opponents
-		if ATTACK_DATA[attack]['target'] == 'all_opponents':
-			for enemy in self.opponent_sprites.sprites():  # Loop through all enemies
-				# Apply the attack damage
-				target_defense = 1 - enemy.monster.get_stat('defense') / 2000
-				if enemy.monster.defending:
-					target_defense -= 0.2  # Reduce defense if defending
-				target_defense = max(0, min(1, target_defense))
-
-				enemy.monster.health -= amount * target_defense
-				self.check_death()  # Check for any deaths after applying damage
-
-				# Play attack animation and sound for each enemy
-				AttackSprite(enemy.rect.center, self.monster_frames['attacks'][ATTACK_DATA[attack]['animation']], self.battle_sprites)
-				self.sounds[ATTACK_DATA[attack]['animation']].play()
-
-		else:
-			# For single target attacks, apply damage to the target
-			target_defense = 1 - target_sprite.monster.get_stat('defense') / 2000
-			if target_sprite.monster.defending:
-				target_defense -= 0.2  # Reduce defense if defending
-			target_defense = max(0, min(1, target_defense))
-
-			# Apply the attack damage
-			target_sprite.monster.health -= amount * target_defense
-			self.check_death()  # Check if the target is defeated
-
-			# Play attack animation and sound for the single target
-			AttackSprite(target_sprite.rect.center, self.monster_frames['attacks'][ATTACK_DATA[attack]['animation']], self.battle_sprites)
-			self.sounds[ATTACK_DATA[attack]['animation']].play()
-
-		# Resume battle state after the attack
-		self.update_all_monsters('resume')
-
-
-	def check_death(self):
-		for monster_sprite in self.opponent_sprites.sprites() + self.player_sprites.sprites():
-			if monster_sprite.monster.health <= 0:
-				if self.player_sprites in monster_sprite.groups(): # player
-					active_monsters = [(monster_sprite.index, monster_sprite.monster) for monster_sprite in self.player_sprites.sprites()]
-					available_monsters = [(index, monster) for index, monster in self.monster_data['player'].items() if monster.health > 0 and (index, monster) not in active_monsters]
-					if available_monsters:
-						new_monster_data = [(monster, index, monster_sprite.pos_index, 'player') for index, monster in available_monsters][0]
-					else:
-						new_monster_data = None
-				else:
-					new_monster_data = (list(self.monster_data['opponent'].values())[0], monster_sprite.index, monster_sprite.pos_index, 'opponent') if self.monster_data['opponent'] else None
-					if self.monster_data['opponent']:
-						del self.monster_data['opponent'][min(self.monster_data['opponent'])]
-					# xp
-					xp_amount = monster_sprite.monster.level * 100 / len(self.player_sprites)
-					for player_sprite in self.player_sprites:
-						player_sprite.monster.update_xp(xp_amount)
-
-				monster_sprite.delayed_kill(new_monster_data)
+			if monster_sprite.monster is monster:
+				return monster_sprite
+
+	def replacing(self):
+		return any(monster_sprite.timers['kill'].active for monster_sprite in self.player_sprites.sprites() + self.opponent_sprites.sprites())
+
+	def check_active(self, dt):
+		# time only runs in the engine while no fainted monster is still waiting for its replacement sprite
+		if self.replacing():
+			return
+		monster = self.engine.advance(dt)
+		if monster:
+			monster_sprite = self.sprite(monster)
+			monster_sprite.set_highlight(True)
+			self.current_monster = monster_sprite
+			if monster_sprite.entity == 'player':
+				self.selection_mode = 'general'
+			else:
+				self.timers['opponent delay'].activate()
+
+	def apply_attack(self, target_sprite, attack):
+		# called by the attacking sprite once its animation is done
+		self.show_events(self.engine.step(Action('attack', target_sprite.monster, attack)))
+
+	def show_events(self, events):
+		for event in events:
+			if event[0] == 'hit':
+				animation = get_attack(event[3]).animation
+				AttackSprite(self.sprite(event[2]).rect.center, self.monster_frames['attacks'][animation], self.battle_sprites)
+				self.sounds[animation].play()
+			elif event[0] == 'faint':
+				_, entity, pos_index, monster, replacement = event
+				new_monster_data = (replacement[1], replacement[0], pos_index, entity) if replacement else None
+				self.sprite(monster).delayed_kill(new_monster_data)
 
 	def opponent_attack(self):
-		ability = choice(self.current_monster.monster.get_abilities())
-		random_target = choice(self.opponent_sprites.sprites()) if ATTACK_DATA[ability]['target'] == 'player' else choice(self.player_sprites.sprites())
-		self.current_monster.activate_attack(random_target, ability)
+		action = self.engine.auto_action()
+		self.current_monster.activate_attack(self.sprite(action.target), action.attack)
 
 	def check_end_battle(self):
 		# opponents have been defeated 
 		if len(self.opponent_sprites) == 0 and not self.battle_over:
 			self.battle_over = True
 			self.end_battle(self.character)
-			for monster in self. monster_data['player'].values():
+			for monster in self.engine.teams['player'].values():
 				monster.initiative = 0
 
 		# player has been defeated 
@@ -301,7 +238,7 @@ class Battle:
 
 			# text 
 			if selected:
-				element = ATTACK_DATA[ability]['element']
+				element = ELEMENTS[get_attack(ability).element]
 				text_color = COLORS[element] if element!= 'normal' else COLORS['black']
 			else:
 				text_color = COLORS['light']
@@ -333,8 +270,7 @@ class Battle:
 		pygame.draw.rect(self.display_surface, COLORS['white'], bg_rect, 0, 5)
 
 		# monsters 
-		active_monsters = [(monster_sprite.index, monster_sprite.monster) for monster_sprite in self.player_sprites]
-		self.available_monsters = {index: monster for index, monster in self.monster_data['player'].items() if (index, monster) not in active_monsters and monster.health > 0}
+		self.available_monsters = self.engine.bench('player')
 
 		for index, monster in enumerate(self.available_monsters.values()):
 			selected = index == self.indexes['switch']
@@ -363,15 +299,13 @@ class Battle:
 				draw_bar(self.display_surface, energy_rect, monster.energy, monster.get_stat('max_energy'), COLORS['blue'], COLORS['black'])
 
 	def update(self, dt):
+		# simulation only, input() and draw() run once per rendered frame
 		self.check_end_battle()
-		
-		# updates
-		self.input()
 		self.update_timers()
 		self.battle_sprites.update(dt)
-		self.check_active()
+		self.check_active(dt)
 
-		# drawing
+	def draw(self):
 		self.display_surface.blit(self.bg_surf, (0,0))
 		self.battle_sprites.draw(self.current_monster, self.selection_side, self.selection_mode, self.indexes['target'], self.player_sprites, self.opponent_sprites)
 		self.draw_ui()
\ No newline at end of file
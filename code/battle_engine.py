@@ -0,0 +1,205 @@
+from data_tables import EFFECTIVENESS, get_attack
+from random import Random
+
+# battle rules without sprites or real time, battle.Battle only presents what happens here
+SIDES = ('player', 'opponent')
+FIELD_SIZE = 3
+
+def other_side(side):
+	return 'opponent' if side == 'player' else 'player'
+
+def defense_factor(monster):
+	target_defense = 1 - monster.get_stat('defense') / 2000
+	if monster.defending:
+		target_defense -= 0.2
+	return max(0, min(1, target_defense))
+
+class Action:
+	# what the monster whose turn it is does: attack, defend, switch or catch
+	def __init__(self, kind, target = None, attack = None, index = None):
+		self.kind = kind
+		self.target = target
+		self.attack = attack
+		self.index = index
+
+	def __repr__(self):
+		return f'action: {self.kind}, {self.attack}, {self.target}'
+
+class BattleEngine:
+	def __init__(self, player_monsters, opponent_monsters, rng = None, field_size = FIELD_SIZE):
+		# teams are index -> Monster dicts, the monsters themselves carry health, energy and initiative
+		self.teams = {'player': player_monsters, 'opponent': opponent_monsters}
+		self.field = {side: {} for side in SIDES}
+		self.caught = []
+		self.rng = rng or Random()
+		self.actor = None
+		self.winner = None
+		self.time = 0
+		self.turns = 0
+
+		# the first healthy monsters by index open the battle, player monsters keep their health between battles
+		for side, team in self.teams.items():
+			healthy = [(index, monster) for index, monster in team.items() if monster.health > 0]
+			for slot, entry in enumerate(healthy[:field_size]):
+				self.field[side][slot] = entry
+		self.check_winner()
+
+	# queries
+	def side_of(self, monster):
+		for side in SIDES:
+			for slot, (index, field_monster) in self.field[side].items():
+				if field_monster is monster:
+					return side, slot, index
+		return None
+
+	def active(self, side = None):
+		if side:
+			return [monster for _, monster in self.field[side].values()]
+		return [monster for field in self.field.values() for _, monster in field.values()]
+
+	def bench(self, side):
+		# healthy team members that are not on the field, caught opponents now belong to the player
+		unavailable = self.active(side) + (self.caught if side == 'opponent' else [])
+		return {index: monster for index, monster in self.teams[side].items() if monster.health > 0 and monster not in unavailable}
+
+	def targets(self, attack, side):
+		target = get_attack(attack).target
+		return self.active(side if target == 'player' else other_side(side))
+
+	# time
+	def advance(self, dt):
+		# initiative grows with speed while nobody has a turn, returns the monster whose turn just started
+		if self.actor or self.winner:
+			return None
+		self.time += dt
+		for monster in self.active():
+			monster.initiative += monster.get_stat('speed') * dt
+		return self.start_turn()
+
+	def skip_to_turn(self):
+		# jumps straight to the next turn instead of ticking, this is what headless battles use
+		if self.actor or self.winner:
+			return self.actor
+		monsters = self.active()
+		speeds = [monster.get_stat('speed') for monster in monsters]
+		waits = [(100 - monster.initiative) / speed for monster, speed in zip(monsters, speeds) if speed > 0]
+		if not waits:
+			return None
+		dt = max(min(waits), 0)
+		self.time += dt
+		for monster, speed in zip(monsters, speeds):
+			monster.initiative += speed * dt
+		# rounding can leave the first monster a hair below 100
+		first = max(monsters, key = lambda monster: monster.initiative)
+		first.initiative = max(first.initiative, 100)
+		return self.start_turn(monsters)
+
+	def start_turn(self, monsters = None):
+		# the monster furthest past 100 goes first, anyone else past it keeps its initiative for the next turn
+		ready = [monster for monster in monsters or self.active() if monster.initiative >= 100]
+		if not ready:
+			return None
+		actor = max(ready, key = lambda monster: monster.initiative)
+		actor.initiative = 0
+		actor.defending = False
+		self.actor = actor
+		return actor
+
+	# actions
+	def step(self, action):
+		# resolves the action of the current actor and returns what happened as events for the presentation
+		actor = self.actor
+		if actor is None:
+			# nobody has a turn, e.g. a second key press after the turn already ended
+			return []
+		side = self.side_of(actor)[0]
+		events = []
+
+		if action.kind == 'attack':
+			self.attack(actor, side, action, events)
+		elif action.kind == 'defend':
+			actor.defending = True
+		elif action.kind == 'switch':
+			slot, new_monster = self.side_of(actor)[1], self.teams[side][action.index]
+			self.field[side][slot] = (action.index, new_monster)
+			events.append(('switch', side, slot, actor, action.index, new_monster))
+		elif action.kind == 'catch':
+			target = action.target
+			if target.health >= target.get_stat('max_health') * 0.9:
+				# a failed catch keeps the turn
+				events.append(('escape', target))
+				return events
+			target_side, slot, _ = self.side_of(target)
+			del self.field[target_side][slot]
+			self.caught.append(target)
+			self.teams[side][len(self.teams[side])] = target
+			events.append(('caught', target))
+
+		self.check_faints(events)
+		self.actor = None
+		self.turns += 1
+		self.check_winner()
+		if self.winner:
+			events.append(('end', self.winner))
+		return events
+
+	def attack(self, actor, side, action, events):
+		attack = get_attack(action.attack)
+		actor.reduce_energy(action.attack)
+		amount = actor.get_base_damage(action.attack)
+
+		# all_opponents always hits the other side of whoever attacks
+		targets = self.active(other_side(side)) if attack.target == 'all_opponents' else [action.target]
+		effectiveness = EFFECTIVENESS[attack.element]
+		for target in targets:
+			damage = amount * effectiveness[target.element_id] * defense_factor(target)
+			target.health -= damage
+			events.append(('hit', actor, target, action.attack, damage))
+
+		for target in targets:
+			if target.health <= 0:
+				self.faint(target, events)
+		for monster in [actor, *targets]:
+			monster.stat_limiter()
+
+	def faint(self, monster, events):
+		side, slot, index = self.side_of(monster)
+		del self.field[side][slot]
+		if side == 'opponent':
+			player_monsters = self.active('player')
+			for player_monster in player_monsters:
+				player_monster.update_xp(monster.level * 100 / len(player_monsters))
+
+		# the first healthy bench monster takes the empty slot
+		replacement = next(iter(self.bench(side).items()), None)
+		if replacement:
+			self.field[side][slot] = replacement
+		events.append(('faint', side, slot, monster, replacement))
+
+	def check_faints(self, events):
+		# any monster on the field without health faints, not only the ones hit this turn
+		for side in SIDES:
+			for monster in self.active(side):
+				if monster.health <= 0:
+					self.faint(monster, events)
+
+	def check_winner(self):
+		if not self.field['opponent']:
+			self.winner = 'player'
+		elif not self.field['player']:
+			self.winner = 'opponent'
+
+	# opponent ai, also used for both sides when simulating
+	def auto_action(self):
+		actor = self.actor
+		attack = self.rng.choice(actor.get_abilities())
+		return Action('attack', self.rng.choice(self.targets(attack, self.side_of(actor)[0])), attack)
+
+	def run(self, policy = None, max_turns = 1000):
+		# a complete battle without any rendering, policy picks the action for the current actor
+		policy = policy or BattleEngine.auto_action
+		while not self.winner and self.turns < max_turns:
+			if self.skip_to_turn() is None:
+				break
+			self.step(policy(self))
+		return self.winner
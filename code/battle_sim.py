@@ -0,0 +1,214 @@
+from game_data import TRAINER_DATA
+from data_tables import ATTACKS, TARGETS, EFFECTIVENESS, get_species
+from battle_engine import FIELD_SIZE
+import numpy as np
+import sys
+
+# the data tables as arrays, indexed by attack and element ids
+ATTACK_AMOUNT = np.array([attack.amount for attack in ATTACKS], dtype = float)
+ATTACK_COST = np.array([attack.cost for attack in ATTACKS], dtype = float)
+ATTACK_ELEMENT = np.array([attack.element for attack in ATTACKS])
+ATTACK_TARGET = np.array([TARGETS.index(attack.target) for attack in ATTACKS])
+ELEMENT_MULTIPLIER = np.array(EFFECTIVENESS)
+STATS = ('max_health', 'max_energy', 'attack', 'defense', 'speed')
+
+class TeamTables:
+	# every monster of both teams is one unit column, player units first
+	def __init__(self, player_team, opponent_team):
+		units = [(side, index, *self.member(member)) for side, team in enumerate((player_team, opponent_team)) for index, member in self.items(team)]
+		species = [get_species(unit[2]) for unit in units]
+		self.side = np.array([unit[0] for unit in units])
+		self.index = np.array([unit[1] for unit in units])
+		self.level = np.array([unit[3] for unit in units])
+		self.xp = np.array([unit[4] for unit in units], dtype = float)
+		self.element = np.array([entry.element for entry in species])
+		self.stats = {stat: np.array([entry.stats[stat] for entry in species], dtype = float) for stat in STATS}
+
+		# abilities padded to the longest list, locked slots never unlock
+		width = max(len(entry.abilities) for entry in species)
+		self.abilities = np.zeros((len(units), width), dtype = int)
+		self.unlock = np.full((len(units), width), np.iinfo(np.int64).max)
+		for unit, entry in enumerate(species):
+			for column, (level, ability) in enumerate(entry.abilities):
+				self.abilities[unit, column] = ability
+				self.unlock[unit, column] = level
+
+	@staticmethod
+	def items(team):
+		return team.items() if isinstance(team, dict) else enumerate(team)
+
+	@staticmethod
+	def member(member):
+		# (name, level) pairs or Monster objects, which also bring their xp
+		if hasattr(member, 'name'):
+			return member.name, member.level, member.xp
+		return member[0], member[1], 0
+
+class BatchState:
+	# per battle arrays, rows of finished battles are dropped after every turn
+	def __init__(self, tables, n, level):
+		self.ids = np.arange(n)
+		self.level = level
+		self.health = tables.stats['max_health'] * self.level
+		self.energy = tables.stats['max_energy'] * self.level
+		self.initiative = np.zeros(self.level.shape)
+		self.defending = np.zeros(self.level.shape, dtype = bool)
+		self.xp = np.tile(tables.xp, (n, 1))
+		self.level_up = self.level * 150.0
+		self.on_field = np.tile(tables.index < FIELD_SIZE, (n, 1))
+		self.dealt = np.zeros((n, 2))
+		self.start_health = np.stack([(self.health * (tables.side == side)).sum(axis = 1) for side in (0, 1)], axis = 1)
+
+	def keep(self, rows):
+		for name, array in vars(self).items():
+			setattr(self, name, array[rows])
+
+class SimResult:
+	def __init__(self, n, max_turns):
+		self.winner = np.zeros(n, dtype = np.int8)
+		self.turns = np.full(n, max_turns)
+		self.damage = np.zeros((n, 2))
+		self.hp_lost = np.zeros((n, 2))
+
+	@property
+	def win_rate(self):
+		return float(np.mean(self.winner == 1))
+
+	def summary(self):
+		# player side first in every pair
+		percentiles = (5, 50, 95)
+		return {
+			'battles': len(self.winner),
+			'win_rate': self.win_rate,
+			'loss_rate': float(np.mean(self.winner == -1)),
+			'draw_rate': float(np.mean(self.winner == 0)),
+			'turns_mean': float(self.turns.mean()),
+			'turns_percentiles': np.percentile(self.turns, percentiles).tolist(),
+			'damage_mean': self.damage.mean(axis = 0).tolist(),
+			'damage_percentiles': np.percentile(self.damage, percentiles, axis = 0).T.tolist(),
+			'hp_lost_mean': self.hp_lost.mean(axis = 0).tolist(),
+		}
+
+def simulate(player_team, opponent_team, n = 10000, seed = None, max_turns = 500, opponent_offsets = None):
+	# runs n battles with the engine's auto_action for both sides, one turn of every battle per loop
+	# opponent_offsets = (low, high) rolls a level offset per opponent monster and battle, like wild encounters
+	tables = TeamTables(player_team, opponent_team)
+	rng = np.random.default_rng(seed)
+	side = tables.side
+	sides = [side == 0, side == 1]
+	units = np.arange(len(side))
+	level = np.tile(tables.level, (n, 1))
+	if opponent_offsets:
+		low, high = opponent_offsets
+		rolls = rng.integers(low, high + 1, size = (n, int(sides[1].sum())))
+		level[:, sides[1]] = np.maximum(level[:, sides[1]] + rolls, 1)
+	state = BatchState(tables, n, level)
+	result = SimResult(n, max_turns)
+
+	for turn in range(max_turns):
+		if not len(state.ids):
+			break
+		rows = np.arange(len(state.ids))
+		level = state.level
+
+		# jump to the next turn: the on-field unit closest to 100 initiative acts
+		speed = tables.stats['speed'] * level
+		with np.errstate(divide = 'ignore'):
+			waits = np.where(state.on_field & (speed > 0), (100 - state.initiative) / speed, np.inf)
+		dt = np.maximum(waits.min(axis = 1), 0)
+		stuck = np.isinf(dt)
+		dt[stuck] = 0
+		state.initiative += np.where(state.on_field, speed * dt[:, None], 0)
+		actor = np.where(state.on_field, state.initiative, -np.inf).argmax(axis = 1)
+		state.initiative[rows, actor] = 0
+		state.defending[rows, actor] = False
+
+		# random ability out of the unlocked ones, energy is not checked (same as the opponent ai)
+		unlocked = tables.unlock[actor] <= level[rows, actor][:, None]
+		count = unlocked.sum(axis = 1)
+		pick = (rng.random(len(rows)) * count).astype(int)
+		column = (np.cumsum(unlocked, axis = 1) > pick[:, None]).argmax(axis = 1)
+		attack = tables.abilities[actor, column]
+		acting = (count > 0) & ~stuck
+		state.energy[rows, actor] -= np.where(acting, ATTACK_COST[attack], 0)
+
+		# own side for 'player' attacks, the other side otherwise, all of it for all_opponents
+		actor_side = side[actor]
+		target_kind = ATTACK_TARGET[attack]
+		target_side = np.where(target_kind == 0, actor_side, 1 - actor_side)
+		candidates = state.on_field & (side[None, :] == target_side[:, None]) & acting[:, None]
+		pick = (rng.random(len(rows)) * candidates.sum(axis = 1)).astype(int)
+		single = units[None, :] == (np.cumsum(candidates, axis = 1) > pick[:, None]).argmax(axis = 1)[:, None]
+		targets = np.where((target_kind == 2)[:, None], candidates, candidates & single)
+
+		# damage, with the element and defense rules of battle_engine
+		amount = tables.stats['attack'][actor] * level[rows, actor] * ATTACK_AMOUNT[attack]
+		defense = np.clip(1 - tables.stats['defense'] * level / 2000 - 0.2 * state.defending, 0, 1)
+		damage = amount[:, None] * ELEMENT_MULTIPLIER[ATTACK_ELEMENT[attack]][:, tables.element] * defense * targets
+		state.health -= damage
+		state.dealt[rows, actor_side] += np.where(side[None, :] != actor_side[:, None], damage, 0).sum(axis = 1)
+
+		# faints in unit order, each one pays out xp and pulls in the first healthy bench unit
+		for unit in units:
+			fainted = np.flatnonzero(targets[:, unit] & (state.health[:, unit] <= 0) & state.on_field[:, unit])
+			if not len(fainted):
+				continue
+			state.on_field[fainted, unit] = False
+			if side[unit] == 1:
+				award_xp(state, fainted, np.flatnonzero(sides[0]), level[fainted, unit])
+			team = np.flatnonzero(sides[side[unit]])
+			bench = (state.health[fainted][:, team] > 0) & ~state.on_field[fainted][:, team]
+			has_bench = bench.any(axis = 1)
+			state.on_field[fainted[has_bench], team[bench.argmax(axis = 1)[has_bench]]] = True
+
+		state.health = np.clip(state.health, 0, tables.stats['max_health'] * state.level)
+		state.energy = np.clip(state.energy, 0, tables.stats['max_energy'] * state.level)
+
+		# winners, finished battles are written out and dropped
+		player_left = (state.on_field & sides[0]).any(axis = 1)
+		opponent_left = (state.on_field & sides[1]).any(axis = 1)
+		winner = np.where(~opponent_left, 1, np.where(~player_left, -1, 0))
+		done = (winner != 0) | stuck
+		if done.any():
+			finish(result, state, done, winner, turn + 1, sides)
+			state.keep(~done)
+
+	if len(state.ids):
+		finish(result, state, np.ones(len(state.ids), dtype = bool), np.zeros(len(state.ids), dtype = int), max_turns, sides)
+	return result
+
+def award_xp(state, rows, player_units, fainted_level):
+	# Monster.update_xp for every player unit on the field, at most one level per call
+	on_field = state.on_field[np.ix_(rows, player_units)]
+	count = on_field.sum(axis = 1)
+	amount = (fainted_level * 100 / np.maximum(count, 1))[:, None]
+	index = np.ix_(rows, player_units)
+	xp, level_up, level = state.xp[index], state.level_up[index], state.level[index]
+	grow = on_field & (level_up - xp > amount)
+	up = on_field & ~grow
+	state.xp[index] = np.where(grow, xp + amount, np.where(up, amount - (level_up - xp), xp))
+	state.level[index] = np.where(up, level + 1, level)
+	state.level_up[index] = np.where(up, state.level[index] * 150.0, level_up)
+
+def finish(result, state, done, winner, turns, sides):
+	ids = state.ids[done]
+	result.winner[ids] = winner[done]
+	result.turns[ids] = turns
+	result.damage[ids] = state.dealt[done]
+	for side, mask in enumerate(sides):
+		result.hp_lost[ids, side] = state.start_health[done, side] - (state.health[done] * mask).sum(axis = 1)
+
+def parse_team(text):
+	# a trainer id from TRAINER_DATA or name:level pairs separated by commas
+	if text in TRAINER_DATA:
+		return TRAINER_DATA[text]['monsters']
+	return [(name, int(level)) for name, level in (pair.split(':') for pair in text.split(','))]
+
+if __name__ == '__main__':
+	if len(sys.argv) < 3:
+		print('[INFO] usage: python code/battle_sim.py Ivieron:32,Atrox:15 o1 [battles]')
+		sys.exit(1)
+	n = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+	summary = simulate(parse_team(sys.argv[1]), parse_team(sys.argv[2]), n).summary()
+	for key, value in summary.items():
+		print(f'[INFO] {key:<20} {value}')
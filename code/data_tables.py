@@ -0,0 +1,87 @@
+from game_data import MONSTER_DATA, ATTACK_DATA, TRAINER_DATA
+from collections import namedtuple
+from types import MappingProxyType
+
+# game_data compiled once at import into immutable, integer indexed tables
+ELEMENTS = ('normal', 'fire', 'water', 'plant', 'almighty')
+TARGETS = ('player', 'opponent', 'all_opponents')
+STAT_NAMES = ('max_health', 'max_energy', 'attack', 'defense', 'recovery', 'speed')
+
+# attack element -> target elements it doubles against, and the ones it is halved against
+STRONG = {'fire': ('plant',), 'water': ('fire',), 'plant': ('water',)}
+WEAK = {'fire': ('water',), 'water': ('plant',), 'plant': ('fire',)}
+
+Attack = namedtuple('Attack', 'id name target amount cost element animation')
+Species = namedtuple('Species', 'id name element stats abilities evolve')
+
+def effectiveness(attack_element, target_element):
+	amount = 1
+	if target_element in STRONG.get(attack_element, ()) or (attack_element == 'almighty' and target_element != 'almighty'):
+		amount *= 2
+	if target_element in WEAK.get(attack_element, ()) or (attack_element != 'almighty' and target_element == 'almighty'):
+		amount *= 0.5
+	return amount
+
+def validate():
+	# every broken reference in game_data, so a typo fails at startup instead of mid battle
+	problems = []
+	for name, data in ATTACK_DATA.items():
+		if data.get('target') not in TARGETS:
+			problems.append(f'attack {name}: unknown target {data.get("target")}')
+		if data.get('element') not in ELEMENTS:
+			problems.append(f'attack {name}: unknown element {data.get("element")}')
+		for key in ('amount', 'cost'):
+			if not isinstance(data.get(key), (int, float)):
+				problems.append(f'attack {name}: {key} is not a number')
+
+	for name, data in MONSTER_DATA.items():
+		stats = data.get('stats', {})
+		if stats.get('element') not in ELEMENTS:
+			problems.append(f'monster {name}: unknown element {stats.get("element")}')
+		for stat in STAT_NAMES:
+			if not isinstance(stats.get(stat), (int, float)) or stats[stat] < 0:
+				problems.append(f'monster {name}: stat {stat} is missing or negative')
+		for level, ability in data.get('abilities', {}).items():
+			if ability not in ATTACK_DATA:
+				problems.append(f'monster {name}: ability {ability} (level {level}) is not in ATTACK_DATA')
+		if data.get('evolve'):
+			target, level = data['evolve']
+			if target not in MONSTER_DATA:
+				problems.append(f'monster {name}: evolves into unknown monster {target}')
+			if not isinstance(level, int) or level < 1:
+				problems.append(f'monster {name}: evolution level {level} is not a positive integer')
+
+	for trainer_id, trainer in TRAINER_DATA.items():
+		for index, (name, level) in trainer.get('monsters', {}).items():
+			if name not in MONSTER_DATA:
+				problems.append(f'trainer {trainer_id}: monster {index} is unknown monster {name}')
+			if not isinstance(level, int) or level < 1:
+				problems.append(f'trainer {trainer_id}: monster {name} has level {level}')
+	return problems
+
+problems = validate()
+if problems:
+	raise ValueError('game_data has broken references:\n  ' + '\n  '.join(problems))
+
+ELEMENT_IDS = MappingProxyType({element: index for index, element in enumerate(ELEMENTS)})
+EFFECTIVENESS = tuple(tuple(effectiveness(attack, target) for target in ELEMENTS) for attack in ELEMENTS)
+
+ATTACK_IDS = MappingProxyType({name: index for index, name in enumerate(ATTACK_DATA)})
+ATTACKS = tuple(
+	Attack(index, name, data['target'], data['amount'], data['cost'], ELEMENT_IDS[data['element']], data['animation'])
+	for index, (name, data) in enumerate(ATTACK_DATA.items()))
+
+SPECIES_IDS = MappingProxyType({name: index for index, name in enumerate(MONSTER_DATA)})
+SPECIES = tuple(
+	Species(
+		index, name, ELEMENT_IDS[data['stats']['element']],
+		MappingProxyType({stat: value for stat, value in data['stats'].items() if stat != 'element'}),
+		tuple((level, ATTACK_IDS[ability]) for level, ability in data['abilities'].items()),
+		(SPECIES_IDS[data['evolve'][0]], data['evolve'][1]) if data['evolve'] else None)
+	for index, (name, data) in enumerate(MONSTER_DATA.items()))
+
+def get_attack(name):
+	return ATTACKS[ATTACK_IDS[name]]
+
+def get_species(name):
+	return SPECIES[SPECIES_IDS[name]]
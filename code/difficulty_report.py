@@ -0,0 +1,158 @@
+from settings import *
+from os.path import exists, dirname
+from os import walk, makedirs
+from concurrent.futures import ProcessPoolExecutor
+from game_data import MONSTER_DATA, ATTACK_DATA, TRAINER_DATA
+from map_compiler import CompiledMap
+import argparse
+import hashlib
+import json
+import csv
+import sys
+
+# player parties the encounters are rated against, override with --team name=Monster:level,...
+REFERENCE_TEAMS = {
+	'start': [('Ivieron', 32), ('Atrox', 15), ('Cindrill', 16), ('Atrox', 10), ('Sparchu', 11), ('Gulfin', 9), ('Jacana', 10)],
+	'early': [('Plumette', 8), ('Sparchu', 8), ('Finsta', 8)],
+}
+REPORT_CACHE_PATH = join('data', 'difficulty_cache.json')
+# wild monsters each get their own random level offset in Game.monster_encounter
+WILD_LEVEL_OFFSETS = (-3, 3)
+SIM_SOURCES = ('data_tables.py', 'battle_engine.py', 'battle_sim.py')
+COLUMNS = ('team', 'kind', 'encounter', 'opponents', 'win_probability', 'expected_turns', 'expected_hp_lost', 'battles')
+
+def wild_encounters(*path):
+	# one entry per distinct monster patch, with the maps it shows up on
+	from asset_loader import parse_tmx
+	encounters = {}
+	for folder_path, _, file_names in walk(join(*path)):
+		for file_name in sorted(file_names):
+			full_path = join(folder_path, file_name)
+			tmx_map = CompiledMap.open(full_path) or parse_tmx(full_path)
+			for obj in tmx_map.get_layer_by_name('Monsters'):
+				key = f"{obj.properties['biome']}:{obj.properties['monsters']}:{obj.properties['level']}"
+				encounter = encounters.setdefault(key, {'monsters': obj.properties['monsters'].split(','), 'level': obj.properties['level'], 'maps': []})
+				if file_name.split('.')[0] not in encounter['maps']:
+					encounter['maps'].append(file_name.split('.')[0])
+	return encounters
+
+def encounters():
+	jobs = {}
+	for trainer_id, trainer in TRAINER_DATA.items():
+		# the nurse and other non fighting characters have no monsters
+		if not trainer.get('monsters'):
+			continue
+		jobs[f'trainer {trainer_id}'] = ('trainer', trainer_id, [list(monster) for monster in trainer['monsters'].values()])
+	for key, encounter in wild_encounters('data', 'maps').items():
+		name = f"wild {key} ({', '.join(encounter['maps'])})"
+		jobs[name] = ('wild', key, [[monster, encounter['level']] for monster in encounter['monsters']])
+	return jobs
+
+def sim_source_hash():
+	sha = hashlib.sha1()
+	for file_name in SIM_SOURCES:
+		with open(join(dirname(__file__), file_name), 'rb') as f:
+			sha.update(f.read())
+	return sha.hexdigest()
+
+def job_hash(kind, team, opponents, battles, source_hash):
+	# only the data this one matchup depends on, so editing a species only reruns the matchups using it
+	species = sorted({name for name, _ in team + opponents})
+	attacks = sorted({attack for name in species if name in MONSTER_DATA for attack in MONSTER_DATA[name]['abilities'].values()})
+	data = {
+		'kind': kind, 'team': team, 'opponents': opponents, 'battles': battles, 'sim': source_hash,
+		'monsters': {name: MONSTER_DATA.get(name) for name in species},
+		'attacks': {attack: ATTACK_DATA.get(attack) for attack in attacks},
+	}
+	return hashlib.sha1(json.dumps(data, sort_keys = True, default = str).encode()).hexdigest()
+
+def run_job(kind, team, opponents, battles, seed):
+	# worker side, wild battles roll a level offset for every opponent monster like the game does
+	from battle_sim import simulate
+	unknown = sorted({name for name, _ in opponents + team if name not in MONSTER_DATA})
+	if unknown:
+		return {'error': f"unknown monsters {', '.join(unknown)}"}
+	offsets = WILD_LEVEL_OFFSETS if kind == 'wild' else None
+	result = simulate(team, opponents, battles, seed, opponent_offsets = offsets)
+	return {
+		'win_probability': result.win_rate,
+		'expected_turns': float(result.turns.mean()),
+		'expected_hp_lost': float(result.hp_lost[:, 0].mean()),
+		'battles': battles,
+	}
+
+def load_cache(cache_path):
+	if not exists(cache_path):
+		return {}
+	with open(cache_path) as f:
+		return json.load(f)
+
+def save_cache(cache, cache_path):
+	makedirs(dirname(cache_path) or '.', exist_ok = True)
+	with open(cache_path, 'w') as f:
+		json.dump(cache, f)
+
+def build_report(teams, battles = 10000, workers = None, cache_path = REPORT_CACHE_PATH):
+	cache = load_cache(cache_path)
+	source_hash = sim_source_hash()
+	rows, pending = [], {}
+	matchups = encounters()
+	for team_name, team in teams.items():
+		team = [list(member) for member in team]
+		for name, (kind, key, opponents) in matchups.items():
+			digest = job_hash(kind, team, opponents, battles, source_hash)
+			row = {'team': team_name, 'kind': kind, 'encounter': name, 'opponents': ' '.join(f'{monster}:{level}' for monster, level in opponents), 'hash': digest}
+			rows.append(row)
+			if digest not in cache:
+				pending[digest] = (kind, team, opponents, battles, int(digest[:8], 16))
+
+	cached = sum(row['hash'] in cache for row in rows)
+	print(f'[INFO] {len(rows)} matchups, {cached} cached, simulating {len(pending)} distinct ones on {workers or cpu_count()} processes')
+	if pending:
+		with ProcessPoolExecutor(workers) as pool:
+			futures = {digest: pool.submit(run_job, *job) for digest, job in pending.items()}
+			for digest, future in futures.items():
+				cache[digest] = future.result()
+		save_cache(cache, cache_path)
+
+	for row in rows:
+		result = cache[row.pop('hash')]
+		if 'error' in result:
+			print(f"[WARNING] {row['encounter']}: {result['error']}")
+		row.update(result)
+	return rows
+
+def write_report(rows, out, format):
+	if format == 'json':
+		json.dump(rows, out, indent = 1)
+		out.write('\n')
+	else:
+		writer = csv.DictWriter(out, COLUMNS + ('error',), extrasaction = 'ignore')
+		writer.writeheader()
+		writer.writerows(rows)
+
+def parse_teams(specs):
+	# name=Monster:level,Monster:level
+	teams = {}
+	for spec in specs:
+		name, members = spec.split('=')
+		teams[name] = [(monster, int(level)) for monster, level in (member.split(':') for member in members.split(','))]
+	return teams
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description = 'simulated difficulty of every trainer and wild monster patch')
+	parser.add_argument('--team', action = 'append', default = [], help = 'reference party as name=Monster:level,..., replaces the built in ones')
+	parser.add_argument('--battles', type = int, default = 10000, help = 'simulated battles per matchup')
+	parser.add_argument('--workers', type = int, default = None, help = 'processes, all cores by default')
+	parser.add_argument('--format', choices = ('csv', 'json'), default = 'csv')
+	parser.add_argument('--out', default = None, help = 'output file, stdout by default')
+	parser.add_argument('--cache', default = REPORT_CACHE_PATH)
+	args = parser.parse_args()
+
+	rows = build_report(parse_teams(args.team) or REFERENCE_TEAMS, args.battles, args.workers, args.cache)
+	if args.out:
+		with open(args.out, 'w', newline = '') as f:
+			write_report(rows, f, args.format)
+		print(f'[INFO] Wrote {len(rows)} rows to {args.out}')
+	else:
+		write_report(rows, sys.stdout, args.format)
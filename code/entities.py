@@ -6,6 +6,8 @@ from monster import Monster
 
 from llm_chat import TextInputBox
 
+# frame keys by moving flag (0 idle, 1 walking) and facing direction, so animate never formats strings
+STATE_KEYS = tuple({facing: f'{facing}{'' if moving else '_idle'}' for facing in ('up', 'down', 'left', 'right')} for moving in (0, 1))
 
 class Entity(pygame.sprite.Sprite):
     def __init__(self, pos, frames, groups, facing_direction):
@@ -14,6 +16,7 @@ class Entity(pygame.sprite.Sprite):
         
         # graphics
         self.frame_index, self.frames = 0, frames
+        self.state_frames = tuple({facing: frames[key] for facing, key in keys.items()} for keys in STATE_KEYS)
         self.facing_direction = facing_direction
         
         # movement
@@ -30,16 +33,25 @@ class Entity(pygame.sprite.Sprite):
     
     def animate(self,dt):
         self.frame_index += ANIMATION_SPEED * dt
-        self.image = self.frames[self.get_state()][int(self.frame_index % len(self.frames[self.get_state()]))]
+        frames = self.state_frames[self.update_facing()][self.facing_direction]
+        self.image = frames[int(self.frame_index % len(frames))]
+        
+    def catch_up(self, dt):
+        # called when waking up from the dormant region, timers kept running on their own
+        self.frame_index += ANIMATION_SPEED * dt
+        
+    def update_facing(self):
+        # returns the moving flag used as the state id
+        if not self.direction:
+            return 0
+        if self.direction.x != 0:
+            self.facing_direction = 'right' if self.direction.x > 0 else 'left'
+        if self.direction.y != 0:
+            self.facing_direction = 'down' if self.direction.y > 0 else 'up'
+        return 1
         
     def get_state(self):
-        moving = bool(self.direction)
-        if moving:
-            if self.direction.x != 0:
-                self.facing_direction = 'right' if self.direction.x > 0 else 'left'
-            if self.direction.y != 0:
-                self.facing_direction = 'down' if self.direction.y > 0 else 'up'
-        return f'{self.facing_direction}{'' if moving else '_idle'}'
+        return STATE_KEYS[self.update_facing()][self.facing_direction]
 
     def change_facing_direction(self, target_pos):
         relation = vector(target_pos) - vector(self.rect.center)
@@ -56,12 +68,13 @@ class Entity(pygame.sprite.Sprite):
         self.blocked = False
         
 class Character(Entity):
-    def __init__(self, pos, frames, groups, facing_direction, character_data, player, create_dialog, collision_sprites, radius, notice_sound):
+    def __init__(self, pos, frames, groups, facing_direction, character_data, player, create_dialog, occupancy, radius, notice_sound):
         super(). __init__(pos, frames, groups, facing_direction)
         self.character_data = character_data
         self.player = player
         self.create_dialog = create_dialog
-        self.collision_rects = [sprite.rect for sprite in collision_sprites if sprite != self]
+        self.occupancy = occupancy
+        self.los_tiles, self.los = None, False
         self.chat_history = []
         self.monsters = {i: Monster(name, lvl) for i, (name, lvl) in character_data['monsters'].items()} if 'monsters' in character_data else None
         
@@ -86,7 +99,7 @@ class Character(Entity):
         return [] #self.character_data['dialog'][f'{'defeated' if self.character_data['defeated'] else 'default'}']
     
     def raycast(self):
-        if check_connections(self.radius, self, self.player) and self.has_los and not self.has_moved and not self.has_noticed:
+        if check_connections(self.radius, self, self.player) and self.has_los() and not self.has_moved and not self.has_noticed:
             self.player.block()
             self.player.change_facing_direction(self.rect.center)
             self.timers['notice'].activate()
@@ -96,9 +109,13 @@ class Character(Entity):
             self.notice_sound.play()
     
     def has_los(self):
-        if vector(self.rect.center).distance_to(self.player.rect.center) < self.radius:
-            collisions = [bool(rect.clipline(self.rect.center, self.player.rect.center)) for rect in self.collision_rects]
-            return not any(collisions)
+        dx, dy = self.player.rect.centerx - self.rect.centerx, self.player.rect.centery - self.rect.centery
+        if dx * dx + dy * dy < self.radius * self.radius:
+            # only traced again once the npc or the player stands on another tile
+            tiles = (self.occupancy.tile(self.rect.center), self.occupancy.tile(self.player.rect.center))
+            if tiles != self.los_tiles:
+                self.los_tiles, self.los = tiles, self.occupancy.line_of_sight(self.rect.center, self.player.rect.center)
+            return self.los
     
     def start_move(self):
         relation = (vector(self.player.rect.center) - vector(self.rect.center)).normalize()
@@ -148,6 +165,16 @@ class Player(Entity):
             input_vector.x += 1
         self.direction = input_vector.normalize() if input_vector else input_vector
             
+    def teleport(self, pos, facing_direction):
+        # used when a cached scene is entered again
+        self.rect.center = pos
+        self.hitbox.center = self.rect.center
+        self.y_sort = self.rect.centery
+        self.facing_direction = facing_direction
+        self.direction = vector()
+        self.noticed = False
+        self.unblock()
+            
     def move(self, dt):
         self.rect.centerx += self.direction.x * self.speed * dt
         self.hitbox.centerx = self.rect.centerx
@@ -158,7 +185,8 @@ class Player(Entity):
         self.collision('vertical')
         
     def collision(self, axis):
-        for sprite in self.collision_sprites:
+        # the pushback stays well inside a tile, so only hitboxes around the player can be hit
+        for sprite in self.collision_sprites.near(self.hitbox.inflate(TILE_SIZE, TILE_SIZE)):
             if sprite.hitbox.colliderect(self.hitbox):
                 if axis == 'horizontal':
                     if self.direction.x > 0:
@@ -1,5 +1,6 @@
 from settings import * 
 from timer import Timer
+from silhouette import silhouette
 
 class Evolution:
 	def __init__(self, frames, start_monster, end_monster, font, end_evolution, star_frames):
@@ -20,8 +21,7 @@ class Evolution:
 		self.tint_surf.set_alpha(200)
 
 		# white tint 
-		self.start_monster_surf_white = pygame.mask.from_surface(self.start_monster_surf).to_surface()
-		self.start_monster_surf_white.set_colorkey('black')
+		self.start_monster_surf_white = silhouette(self.start_monster_surf)
 		self.tint_amount, self.tint_speed = 0, 80
 		self.start_monster_surf_white.set_alpha(self.tint_amount)
 
@@ -1,32 +1,276 @@
 from settings import *
-from support import import_image
-from os.path import join
 from entities import Entity
+from spatial import SpatialHash
+from bisect import bisect_left
+from animation import AnimationClocks
 
-class AllSprites(pygame.sprite.Group):
-    def __init__(self):
+class SpatialGroup(pygame.sprite.Group):
+    # group that keeps its sprites in a spatial hash, keyed on the rect stored under attribute
+    def __init__(self, cell_size, attribute = 'rect'):
         super().__init__()
+        self.spatial_hash = SpatialHash(cell_size)
+        self.attribute = attribute
+        self.pending = {}
+        self.moving = {}
+        self.order = {}
+        self.added = 0
+    
+    def add_internal(self, sprite, layer = None):
+        super().add_internal(sprite, layer)
+        # sprites join the group before their rect exists, they are hashed on the next query
+        self.pending[sprite] = None
+        self.order[sprite] = self.added
+        self.added += 1
+        if isinstance(sprite, Entity):
+            self.moving[sprite] = None
+    
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if sprite in self.pending:
+            del self.pending[sprite]
+        else:
+            self.spatial_hash.remove(sprite)
+        self.moving.pop(sprite, None)
+        del self.order[sprite]
+    
+    def update_hash(self):
+        for sprite in self.pending:
+            self.spatial_hash.insert(sprite, getattr(sprite, self.attribute))
+        self.pending.clear()
+        # entities only touch the grid when they cross into another cell
+        for sprite in self.moving:
+            self.spatial_hash.move(sprite, getattr(sprite, self.attribute))
+    
+    def near(self, rect):
+        # sprites in the cells around rect, in the order they joined the group
+        self.update_hash()
+        return sorted(self.spatial_hash.query(rect), key = self.order.__getitem__)
+    
+    def within(self, point, radius):
+        rect = pygame.FRect(0, 0, radius * 2, radius * 2)
+        rect.center = point
+        return [sprite for sprite in self.near(rect) if vector(point).distance_to(getattr(sprite, self.attribute).center) < radius]
+
+class AllSprites(SpatialGroup):
+    def __init__(self, shadow_surf, noticed_surf):
+        super().__init__(CULL_CELL_SIZE)
         self.display_surface = pygame.display.get_surface()
         self.offset = vector()
-        self.shadow_surf = import_image(join('graphics', 'other', 'shadow'))
-        self.noticed_surf = import_image(join('graphics', 'ui', 'notice'))
-        
-    def draw(self, player):
-        self.offset.x = -(player.rect.centerx - WINDOW_WIDTH / 2)
-        self.offset.y = -(player.rect.centery - WINDOW_HEIGHT / 2)
-        
-        bg_sprites = [sprite for sprite in self if sprite.z < WORLD_LAYERS['main']]
-        main_sprites = sorted([sprite for sprite in self if sprite.z == WORLD_LAYERS['main']], key = lambda sprite: sprite.y_sort)
-        fg_sprites = [sprite for sprite in self if sprite.z > WORLD_LAYERS['main']]
-        
-        for layer in (bg_sprites, main_sprites, fg_sprites):
-                for sprite in layer:
-                    if isinstance(sprite, Entity):
-                        self.display_surface.blit(self.shadow_surf, sprite.rect.topleft + self.offset + vector(40, 110))
-                    self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
-                    if sprite == player and player.noticed:
-                        rect = self.noticed_surf.get_frect(midbottom = sprite.rect.midtop)
-                        self.display_surface.blit(self.noticed_surf, rect.topleft + self.offset)
+        self.shadow_surf = shadow_surf
+        self.noticed_surf = noticed_surf
+        self.terrain = None
+        self.clocks = AnimationClocks()
+        self.updating = {}
+        self.time = 0
+        self.last_update = {}
+        self.stats = {'sprites': 0, 'considered': 0, 'drawn': 0, 'dirty': -1, 'active': 0, 'dormant': 0}
+        
+        # dirty rect mode, what each visible sprite looked like last frame
+        self.snapshot = None
+        self.snapshot_offset = vector()
+        
+        # moving sprites are drawn between their last two simulation ticks
+        self.previous = {}
+        self.positions = {}
+        self.blit_list = []
+        
+        # layer buckets, below and above keep insertion order, main stays sorted by (y_sort, order)
+        self.below = {}
+        self.above = {}
+        self.main_keys = []
+        self.main_sprites = []
+        self.sort_keys = {}
+    
+    def add_internal(self, sprite, layer = None):
+        super().add_internal(sprite, layer)
+        # sprites without an update of their own are skipped in update()
+        if type(sprite).update is not pygame.sprite.Sprite.update:
+            self.updating[sprite] = None
+            self.last_update[sprite] = self.time
+    
+    def remove_internal(self, sprite):
+        if sprite not in self.pending:
+            self.below.pop(sprite, None)
+            self.above.pop(sprite, None)
+            if sprite in self.sort_keys:
+                self.remove_main(sprite)
+        super().remove_internal(sprite)
+        self.previous.pop(sprite, None)
+        self.updating.pop(sprite, None)
+        self.last_update.pop(sprite, None)
+    
+    def insert_main(self, sprite):
+        key = (sprite.y_sort, self.order[sprite])
+        index = bisect_left(self.main_keys, key)
+        self.main_keys.insert(index, key)
+        self.main_sprites.insert(index, sprite)
+        self.sort_keys[sprite] = key
+    
+    def remove_main(self, sprite):
+        index = bisect_left(self.main_keys, self.sort_keys.pop(sprite))
+        del self.main_keys[index]
+        del self.main_sprites[index]
+    
+    def update_hash(self):
+        # z is only known once the sprite is built, so the buckets are filled with the hash
+        for sprite in self.pending:
+            if sprite.z < WORLD_LAYERS['main']:
+                self.below[sprite] = None
+            elif sprite.z == WORLD_LAYERS['main']:
+                self.insert_main(sprite)
+            else:
+                self.above[sprite] = None
+        super().update_hash()
+        
+        for sprite in self.moving:
+            # only sprites whose y_sort changed move inside the main bucket
+            key = self.sort_keys.get(sprite)
+            if key and key[0] != sprite.y_sort:
+                self.remove_main(sprite)
+                self.insert_main(sprite)
+    
+    def active_sprites(self, center):
+        # sprites with an update near the camera, everything else sleeps
+        if center is None:
+            return list(self.updating)
+        self.update_hash()
+        region = pygame.FRect(0, 0, WINDOW_WIDTH + ACTIVITY_MARGIN * 2, WINDOW_HEIGHT + ACTIVITY_MARGIN * 2)
+        region.center = center
+        nearby = [sprite for sprite in self.spatial_hash.query(region) if sprite in self.updating and sprite.rect.colliderect(region)]
+        return sorted(nearby, key = self.order.__getitem__)
+    
+    def update(self, dt, center = None):
+        self.previous.clear()
+        for sprite in self.moving:
+            self.previous[sprite] = sprite.rect.topleft
+        self.clocks.update(dt)
+        
+        self.time += dt
+        active = self.active_sprites(center)
+        for sprite in active:
+            # waking sprites first jump ahead by the time they slept
+            slept = self.time - self.last_update[sprite] - dt
+            if slept > 0 and hasattr(sprite, 'catch_up'):
+                sprite.catch_up(slept)
+            self.last_update[sprite] = self.time
+            sprite.update(dt)
+        self.stats['active'], self.stats['dormant'] = len(active), len(self.updating) - len(active)
+        self.update_hash()
+    
+    def reset_motion(self):
+        # after a teleport nothing should be interpolated from the old position or kept from the old frame
+        self.previous.clear()
+        self.positions.clear()
+        self.snapshot = None
+    
+    def draw_rect(self, sprite):
+        position = self.positions.get(sprite)
+        return sprite.rect if position is None else sprite.rect.move_to(topleft = position)
+    
+    def interpolate(self, alpha):
+        self.positions.clear()
+        if alpha < 1:
+            for sprite, previous in self.previous.items():
+                if previous != sprite.rect.topleft:
+                    self.positions[sprite] = vector(previous).lerp(sprite.rect.topleft, alpha)
+    
+    def layer_blits(self, sprites, player):
+        # plain float math and one reused list, no vectors per sprite
+        offset_x, offset_y = self.offset
+        shadow_x, shadow_y = SHADOW_OFFSET
+        blits = self.blit_list
+        blits.clear()
+        for sprite in sprites:
+            rect = self.draw_rect(sprite)
+            x, y = rect.x + offset_x, rect.y + offset_y
+            if sprite in self.moving:
+                blits.append((self.shadow_surf, (x + shadow_x, y + shadow_y)))
+            blits.append((sprite.image, (x, y)))
+            if sprite is player and player.noticed:
+                rect = self.noticed_surf.get_frect(midbottom = rect.midtop)
+                blits.append((self.noticed_surf, (rect.x + offset_x, rect.y + offset_y)))
+        self.display_surface.blits(blits, False)
+    
+    def sprite_area(self, sprite, player):
+        # screen area the sprite covers, with its shadow and the notice icon
+        rect = self.draw_rect(sprite)
+        area = rect.move(self.offset)
+        if sprite in self.moving:
+            area = area.union(self.shadow_surf.get_frect(topleft = rect.topleft + self.offset + SHADOW_OFFSET))
+        if sprite == player and player.noticed:
+            area = area.union(self.noticed_surf.get_frect(midbottom = rect.midtop + self.offset))
+        return pygame.Rect(area).inflate(4, 4)
+    
+    def draw_layers(self, visible, player):
+        # the visible part of the bg and fg buckets is small, sorting it beats walking the bucket
+        order = self.order.__getitem__
+        self.layer_blits(sorted(visible.intersection(self.below), key = order), player)
+        self.layer_blits([sprite for sprite in self.main_sprites if sprite in visible], player)
+        self.layer_blits(sorted(visible.intersection(self.above), key = order), player)
+    
+    def dirty_rects(self, snapshot):
+        rects = []
+        for sprite, (image, area) in snapshot.items():
+            old = self.snapshot.get(sprite)
+            if old is None or old[0] is not image or old[1] != area:
+                rects.append(area)
+                if old: rects.append(old[1])
+        rects.extend(area for sprite, (_, area) in self.snapshot.items() if sprite not in snapshot)
+        
+        # merge overlapping rects so every pixel is redrawn once
+        screen = self.display_surface.get_rect()
+        merged = []
+        for rect in rects:
+            rect = rect.clip(screen)
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect = rect.union(merged.pop(index))
+                index = rect.collidelist(merged)
+            if rect:
+                merged.append(rect)
+        return merged
+    
+    def draw(self, player, dirty = False, alpha = 1):
+        # returns the changed screen rects in dirty mode, None when everything was redrawn
+        self.interpolate(alpha)
+        center = self.draw_rect(player).center
+        self.offset.x = -(center[0] - WINDOW_WIDTH / 2)
+        self.offset.y = -(center[1] - WINDOW_HEIGHT / 2)
+        
+        self.update_hash()
+        view = pygame.FRect(-self.offset.x, -self.offset.y, WINDOW_WIDTH, WINDOW_HEIGHT).inflate(CULL_MARGIN * 2, CULL_MARGIN * 2)
+        candidates = self.spatial_hash.query(view)
+        visible = {sprite for sprite in candidates if sprite.rect.colliderect(view)}
+        self.stats['sprites'], self.stats['considered'], self.stats['drawn'] = len(self), len(candidates), len(visible)
+        
+        rects = None
+        if dirty:
+            snapshot = {sprite: (sprite.image, self.sprite_area(sprite, player)) for sprite in visible}
+            # a moved camera changes every pixel, so only a still camera keeps the last frame
+            if self.snapshot is not None and self.offset == self.snapshot_offset:
+                rects = self.dirty_rects(snapshot)
+                if sum(rect.w * rect.h for rect in rects) > WINDOW_WIDTH * WINDOW_HEIGHT * DIRTY_RECT_LIMIT:
+                    rects = None
+            self.snapshot, self.snapshot_offset = snapshot, self.offset.copy()
+        else:
+            self.snapshot = None
+        self.stats['dirty'] = len(rects) if rects is not None else -1
+        
+        if rects is None:
+            self.display_surface.fill('black')
+            if self.terrain:
+                self.terrain.draw(self.display_surface, self.offset)
+            self.draw_layers(visible, player)
+            return None
+        
+        for rect in rects:
+            self.display_surface.set_clip(rect)
+            self.display_surface.fill('black')
+            if self.terrain:
+                self.terrain.draw(self.display_surface, self.offset)
+            self.draw_layers({sprite for sprite in visible if snapshot[sprite][1].colliderect(rect)}, player)
+        self.display_surface.set_clip(None)
+        return rects
                         
 class BattleSprites(pygame.sprite.Group):
 	def __init__(self):
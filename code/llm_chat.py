@@ -1,12 +1,71 @@
 from settings import *
 from os.path import join
-
-from llama_cpp import Llama
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from time import perf_counter
+import threading
 
 model_path = join("models", "mistral", "mistral-7b-instruct-v0.1.Q4_K_M.gguf")
-llm = Llama(model_path=model_path, n_ctx=2048, n_threads=6, logits_all=True)
-analyzer = SentimentIntensityAnalyzer()
+
+# llama_cpp and vaderSentiment are heavy, so both are only imported and built on first use
+llm = None
+analyzer = None
+
+def get_llm():
+    global llm
+    if llm is None:
+        from llama_cpp import Llama
+        llm = Llama(model_path=model_path, n_ctx=2048, n_threads=6, logits_all=True)
+    return llm
+
+def get_analyzer():
+    global analyzer
+    if analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        analyzer = SentimentIntensityAnalyzer()
+    return analyzer
+
+class ModelLoader:
+    # builds the model on a background thread so the overworld does not wait for it
+    def __init__(self):
+        self.state = 'idle'
+        self.error = None
+        self.thread = None
+        self.timings = {}
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def start(self):
+        if self.thread is None:
+            self.state = 'loading'
+            self.thread = threading.Thread(target=self.load, name='model-loader', daemon=True)
+            self.thread.start()
+
+    def load(self):
+        try:
+            start = perf_counter()
+            get_llm()
+            get_analyzer()
+            self.timings['load'] = perf_counter() - start
+
+            # a short dummy prompt primes the caches before the first real reply
+            self.state = 'warming up'
+            start = perf_counter()
+            get_llm()(LLM_WARMUP_PROMPT, max_tokens=1)
+            self.timings['warm-up'] = perf_counter() - start
+
+            self.state = 'ready'
+            print(f"[INFO] Model ready after {sum(self.timings.values()):.2f} seconds")
+        except Exception as e:
+            print(f"[ERROR] Model failed to load: {e}")
+            self.error = e
+            self.state = 'failed'
+
+    def wait(self, timeout=None):
+        if self.thread:
+            self.thread.join(timeout)
+
+model_loader = ModelLoader()
 
 def get_npc_response(player_prompt: str, local_prompt: str, history=None) -> tuple[str, str]:
     if history is None:
@@ -27,7 +86,7 @@ def get_npc_response(player_prompt: str, local_prompt: str, history=None) -> tup
     print("[DEBUG] Sending to model:", full_prompt.encode('utf-8', errors='replace'))
 
     try:
-        output = llm(full_prompt, max_tokens=150)
+        output = get_llm()(full_prompt, max_tokens=150)
         raw = output['choices'][0]['text'].strip()
 
         # Post-process and extract mood + reply
@@ -60,11 +119,11 @@ def is_bad_response(text: str) -> bool:
     return any(bad.lower() in lowered for bad in BAD_OUTPUT_KEYWORDS)
 
 def analyze_sentiment(text: str) -> dict:
-    sentiment_score = analyzer.polarity_scores(text)
+    sentiment_score = get_analyzer().polarity_scores(text)
     return sentiment_score
 
 def is_negative_sentiment(reply: str) -> bool:
-    sentiment_score = analyzer.polarity_scores(reply)  # Use the pre-initialized analyzer
+    sentiment_score = get_analyzer().polarity_scores(reply)
     print(f"[DEBUG] Sentiment score for reply: {sentiment_score}")
 
     # Check if sentiment is negative based on compound score
@@ -1,14 +1,10 @@
 import math
 import csv
-from llama_cpp import *
 from os.path import join
 import time
-from llm_chat import *
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.util import ngrams
-from nltk.translate.meteor_score import single_meteor_score
+from llm_chat import get_llm
+
+# nltk is imported inside the metric functions so it only loads once a reply is evaluated
 
 
 # nltk.download('punkt')
@@ -18,7 +14,7 @@ from nltk.translate.meteor_score import single_meteor_score
 def calculate_perplexity(reply: str) -> float:
     print(f"[DEBUG] Calculating perplexity via llama_cpp for reply: {reply!r}")
 
-    out = llm(
+    out = get_llm()(
         reply,
         max_tokens=0,  
         echo=True,    
@@ -58,6 +54,9 @@ def evaluate_perplexity(reply: str, player_input: str, npc_context: dict) -> flo
     return ppl
 
 def calculate_bleu(reference: str, candidate: str) -> float:
+    from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+    from nltk.tokenize import word_tokenize
+
     reference_tokens = [word_tokenize(reference.lower())]  # Tokenize the reference and make it lowercase
     candidate_tokens = word_tokenize(candidate.lower())   # Tokenize the candidate and make it lowercase
     
@@ -80,6 +79,9 @@ def evaluate_bleu(reference: str, candidate: str) -> float:
     return bleu_score
 
 def calculate_meteor(reference: str, candidate: str) -> float:
+    from nltk.translate.meteor_score import single_meteor_score
+    from nltk.tokenize import word_tokenize
+
     print(f"[DEBUG] Calculating METEOR for reference: {reference!r} and candidate: {candidate!r}")
     
     # Tokenize both the reference and candidate sentences
@@ -97,6 +99,9 @@ def evaluate_meteor(reference: str, candidate: str) -> float:
     return meteor_score_value
 
 def calculate_distinct(response: str, n: int = 1) -> float:
+    from nltk.tokenize import word_tokenize
+    from nltk.util import ngrams
+
     print(f"[DEBUG] Calculating Distinct-{n} for response: {response!r}")
     
     # Tokenize the response into words
@@ -1,14 +1,21 @@
+from time import perf_counter
+import_start = perf_counter()
+
 from settings import *
-from pytmx.util_pygame import load_pygame
 from os.path import join
+import sys
 import time
 import threading
 from random import randint
 
 from sprite import *
 from entities import Player, Character
-from groups import AllSprites
+from scenes import Scene, SceneCache, PrefetchZone
+from terrain import TerrainChunks
+from occupancy import OccupancyGrid
 from support import *
+from asset_loader import AssetDecoder
+from profiler import StartupProfiler, AllocationReport
 from game_data import *
 from dialog import *
 from battle import Battle
@@ -17,14 +24,24 @@ from timer import Timer
 from evolutions import Evolution
 from monster import Monster
 
-from llm_chat import *
-from llm_evaluation import *
+from llm_chat import TextInputBox, model_loader, get_npc_response, analyze_sentiment
+from llm_evaluation import evaluate_perplexity, evaluate_bleu, evaluate_meteor, evaluate_distinct
+
+import_time = perf_counter() - import_start
 
 class Game:
-    def __init__(self):
-        pygame.init()
-        self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        pygame.display.set_caption('Monster Hunter 7')
+    def __init__(self, profile_startup = False, dirty_rects = DIRTY_RECTS, alloc_report = False):
+        self.profile_startup = profile_startup
+        self.dirty_rects = dirty_rects
+        self.allocations = AllocationReport(alloc_report)
+        self.profiler = StartupProfiler()
+        self.profiler.record('module imports', import_time)
+        model_loader.start()
+
+        with self.profiler.phase('pygame init'):
+            pygame.init()
+            self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+            pygame.display.set_caption('Monster Hunter 7')
         self.clock = pygame.time.Clock()
         self.encounter_timer = Timer(2000, func = self.monster_encounter)
         
@@ -46,13 +63,6 @@ class Game:
             2: Monster('Larvea', 12),
         }
         
-        # groups
-        self.all_sprites = AllSprites()
-        self.collision_sprites = pygame.sprite.Group()
-        self.character_sprites = pygame.sprite.Group()
-        self.transition_sprites = pygame.sprite.Group()
-        self.monster_sprites = pygame.sprite.Group()
-        
         # transition
         self.transition_target = None
         self.tint_surf = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
@@ -72,8 +82,13 @@ class Game:
         
         self.in_conversation = False
         
-        self.import_assets()
-        self.setup(self.tmx_maps['world'], 'house')
+        with self.profiler.phase('import_assets') as phase:
+            self.import_assets()
+        if not self.profile_startup:
+            self.profiler.report('import_assets', phase)
+        with self.profiler.phase(f'setup({START_MAP})'):
+            self.scenes = SceneCache(self.tmx_maps, self.build_scene)
+            self.enter_scene(START_MAP, 'house')
         self.audio['overworld'].play(-1)
         
         self.dialog_tree = None
@@ -83,101 +98,169 @@ class Game:
         self.evolution = None
     
     def import_assets(self):
-        self.tmx_maps = tmx_importer(join('data', 'maps'))
+        profiler = self.profiler
+        pack = use_asset_pack(ASSET_PACK_PATH)
+        with profiler.phase('compiled map'):
+            # other maps are loaded on first use, a compiled start map is memory mapped right away
+            self.tmx_maps = tmx_importer(join('data', 'maps'), size = MAP_CACHE_SIZE)
+            compiled = self.tmx_maps.load_compiled(START_MAP)
+        if PARALLEL_LOADING:
+            # submitted in the order the groups below consume them
+            decoder = AssetDecoder(LOADER_WORKERS)
+            if not compiled:
+                decoder.submit_map('data', 'maps', f'{START_MAP}.tmx')
+            # only what the importers below read, map tilesets are loaded later by the scene builds
+            skip = pack.covers if pack else None
+            for path in LOADER_IMAGES:
+                decoder.submit_images('graphics', *path, skip = skip)
+            use_asset_decoder(decoder)
+
+        with profiler.phase('maps'):
+            self.tmx_maps[START_MAP]
         
-        self.overworld_frames = {
-            'water' : import_folder(join('graphics', 'tilesets', 'water')),
-            'coast' : coast_importer(24, 12, join('graphics', 'tilesets', 'coast')),
-            'characters' : all_character_import(join('graphics', 'characters'))
-        }
+        with profiler.phase('overworld frames'):
+            self.overworld_frames = {
+                'water' : import_folder(join('graphics', 'tilesets', 'water')),
+                'coast' : coast_importer(24, 12, join('graphics', 'tilesets', 'coast')),
+                'characters' : all_character_import(join('graphics', 'characters')),
+                'shadow': import_image('graphics', 'other', 'shadow'),
+            }
         
-        self.monster_frames = {
-            'icons': import_folder_dict(join( 'graphics', 'icons')),
-            'monsters': monster_importer(4,2, join('graphics', 'monsters')),
-            'ui': import_folder_dict(join('graphics', 'ui')),
-            'attacks': attack_importer(join('graphics', 'attacks'))
-        }
-        self.monster_frames['outlines'] = outline_creator(self.monster_frames['monsters'], 4)
+        with profiler.phase('monster frames'):
+            self.monster_frames = {
+                'icons': import_folder_dict(join( 'graphics', 'icons')),
+                'monsters': monster_importer(4,2, join('graphics', 'monsters')),
+                'ui': import_folder_dict(join('graphics', 'ui')),
+                'attacks': attack_importer(join('graphics', 'attacks'))
+            }
+        with profiler.phase('outlines'):
+            self.monster_frames['outlines'] = outline_creator(self.monster_frames['monsters'], 4)
         
-        self.fonts = {
-            'dialog' : pygame.font.Font(join('graphics', 'fonts', 'PixeloidSans.ttf'), 30),
-            'regular': pygame.font.Font(join('graphics', 'fonts', 'PixeloidSans.ttf'), 18),
-			'small': pygame.font.Font(join('graphics', 'fonts', 'PixeloidSans.ttf'), 14),
-			'bold': pygame.font.Font(join('graphics', 'fonts', 'dogicapixelbold.otf'), 20),
-        }
-        self.bg_frames = import_folder_dict(join('graphics', 'backgrounds'))
-        self.start_animation_frames = import_folder(join('graphics', 'other', 'star animation'))
+        with profiler.phase('fonts'):
+            self.fonts = {
+                'dialog' : pygame.font.Font(join('graphics', 'fonts', 'PixeloidSans.ttf'), 30),
+                'regular': pygame.font.Font(join('graphics', 'fonts', 'PixeloidSans.ttf'), 18),
+                'small': pygame.font.Font(join('graphics', 'fonts', 'PixeloidSans.ttf'), 14),
+                'bold': pygame.font.Font(join('graphics', 'fonts', 'dogicapixelbold.otf'), 20),
+            }
+        with profiler.phase('backgrounds'):
+            self.bg_frames = import_folder_dict(join('graphics', 'backgrounds'))
+            self.start_animation_frames = import_folder(join('graphics', 'other', 'star animation'))
         
-        self.audio = audio_importer(join('audio'))
+        with profiler.phase('audio'):
+            self.audio = audio_importer(join('audio'))
         
         for sound in self.audio.values():
             sound.set_volume(0.10)
+
+        if PARALLEL_LOADING:
+            use_asset_decoder(None)
+            decoder.shutdown()
         
-    def setup(self, tmx_map, player_start_pos):
-        
-        # clear map
-        for group in (self.all_sprites, self.collision_sprites, self.transition_sprites, self.character_sprites):
-            group.empty()
+    def build_scene(self, name, tmx_map):
+        # generator, yields between slices so a prefetch can spread the work over several frames
+        scene = Scene(name, self.overworld_frames['shadow'], self.monster_frames['ui']['notice'])
         
         # terrain
-        for layer in ['Terrain', 'Terrain Top']:
-            for x, y, surf in tmx_map.get_layer_by_name(layer).tiles():
-                Sprite((x * TILE_SIZE, y * TILE_SIZE), surf, self.all_sprites, WORLD_LAYERS['bg'])
+        scene.all_sprites.terrain = TerrainChunks(chunk_size = TERRAIN_CHUNK_SIZE)
+        yield from scene.all_sprites.terrain.bake(tmx_map, ['Terrain', 'Terrain Top'])
         
         # water
         for obj in tmx_map.get_layer_by_name('Water'):
             for x in range((int(obj.x)), int(obj.x + obj.width), TILE_SIZE):
                 for y in range((int(obj.y)), int(obj.y + obj.height), TILE_SIZE):
-                    AnimatedSprite((x,y), self.overworld_frames['water'], self.all_sprites, WORLD_LAYERS['water'])
+                    ClockedSprite((x,y), scene.all_sprites.clocks.get(self.overworld_frames['water']), scene.all_sprites, WORLD_LAYERS['water'])
+            yield
                     
         # coast
         for obj in tmx_map.get_layer_by_name('Coast'):
             terrain = obj.properties['terrain']
             side = obj.properties['side']
-            AnimatedSprite((obj.x, obj.y), self.overworld_frames['coast'][terrain][side], self.all_sprites, WORLD_LAYERS['bg'])
+            ClockedSprite((obj.x, obj.y), scene.all_sprites.clocks.get(self.overworld_frames['coast'][terrain][side]), scene.all_sprites, WORLD_LAYERS['bg'])
+        yield
             
         # object
-        for obj in tmx_map.get_layer_by_name('Objects'):
+        for index, obj in enumerate(tmx_map.get_layer_by_name('Objects'), 1):
             if obj.name == 'top':
-                Sprite((obj.x, obj.y), obj.image, self.all_sprites, WORLD_LAYERS['top'])
+                Sprite((obj.x, obj.y), obj.image, scene.all_sprites, WORLD_LAYERS['top'])
             else:
-                CollidableSprite((obj.x, obj.y), obj.image, (self.all_sprites, self.collision_sprites))
+                CollidableSprite((obj.x, obj.y), obj.image, (scene.all_sprites, scene.collision_sprites))
+            if index % PREFETCH_SLICE_OBJECTS == 0:
+                yield
+        yield
         
         # transition objects
         for obj in tmx_map.get_layer_by_name('Transition'):
-            TransitionSprite((obj.x, obj.y), (obj.width, obj.height), (obj.properties['target'], obj.properties['pos']), self.transition_sprites)
+            sprite = TransitionSprite((obj.x, obj.y), (obj.width, obj.height), (obj.properties['target'], obj.properties['pos']), scene.transition_sprites)
+            scene.trigger_zones.add(sprite, on_enter = self.transition, on_stay = self.transition)
+            scene.trigger_zones.add(PrefetchZone(sprite), on_enter = self.prefetch_scene)
         
         # collision
-        for obj in tmx_map.get_layer_by_name('Collisions'):
-            BorderSprite((obj.x, obj.y), pygame.Surface((obj.width, obj.height)), self.collision_sprites)
+        for index, obj in enumerate(tmx_map.get_layer_by_name('Collisions'), 1):
+            BorderSprite((obj.x, obj.y), pygame.Surface((obj.width, obj.height)), scene.collision_sprites)
+            if index % PREFETCH_SLICE_OBJECTS == 0:
+                yield
+        yield
+        
+        # line of sight, only the static colliders block it
+        scene.occupancy = OccupancyGrid(tmx_map.width, tmx_map.height, [sprite.rect for sprite in scene.collision_sprites])
+        yield
         
         # grass
-        for obj in tmx_map.get_layer_by_name('Monsters'):
-            MonsterPatchSprite((obj.x, obj.y), obj.image, (self.all_sprites, self.monster_sprites), obj.properties['biome'], obj.properties['monsters'], obj.properties['level'])
+        for index, obj in enumerate(tmx_map.get_layer_by_name('Monsters'), 1):
+            sprite = MonsterPatchSprite((obj.x, obj.y), obj.image, (scene.all_sprites, scene.monster_sprites), obj.properties['biome'], obj.properties['monsters'], obj.properties['level'])
+            scene.trigger_zones.add(sprite, on_enter = self.check_monster, on_stay = self.check_monster)
+            if index % PREFETCH_SLICE_OBJECTS == 0:
+                yield
+        yield
             
-        # entities
-        for obj in tmx_map.get_layer_by_name('Entities'):
+        # entities, one player per scene that is moved to the start position on every visit
+        entities = list(tmx_map.get_layer_by_name('Entities'))
+        for obj in entities:
             if obj.name == 'Player':
-                if obj.properties['pos'] == player_start_pos:
-                    self.player = Player(
+                scene.starts[obj.properties['pos']] = ((obj.x, obj.y), obj.properties['direction'])
+                if not scene.player:
+                    scene.player = Player(
                         pos = (obj.x, obj.y), 
                         frames = self.overworld_frames['characters']['player'], 
-                        groups = self.all_sprites,
+                        groups = scene.all_sprites,
                         facing_direction = obj.properties['direction'],
-                        collision_sprites = self.collision_sprites)
-                    self.player.game = self
-            else:
+                        collision_sprites = scene.collision_sprites)
+                    scene.player.game = self
+        yield
+        for index, obj in enumerate(entities, 1):
+            if index % PREFETCH_SLICE_OBJECTS == 0:
+                yield
+            if obj.name != 'Player':
                 Character(
                     pos = (obj.x, obj.y), 
                     frames = self.overworld_frames['characters'][obj.properties['graphic']], 
-                    groups = (self.all_sprites, self.collision_sprites, self.character_sprites),
+                    groups = (scene.all_sprites, scene.collision_sprites, scene.character_sprites),
                     facing_direction = obj.properties['direction'],
                     character_data = TRAINER_DATA[obj.properties['character_id']],
-                    player = self.player,
+                    player = scene.player,
                     create_dialog = self.create_dialog,
-                    collision_sprites = self.collision_sprites,
+                    occupancy = scene.occupancy,
                     radius = obj.properties['radius'],
                     notice_sound = self.audio['notice'])
+        return scene
+    
+    def enter_scene(self, name, player_start_pos):
+        # cached scenes are swapped in as they were left, only the player moves to the start
+        scene = self.scenes.get(name)
+        scene.place_player(player_start_pos)
+        self.scene = scene
+        self.all_sprites = scene.all_sprites
+        self.collision_sprites = scene.collision_sprites
+        self.character_sprites = scene.character_sprites
+        self.transition_sprites = scene.transition_sprites
+        self.monster_sprites = scene.monster_sprites
+        self.trigger_zones = scene.trigger_zones
+        self.occupancy = scene.occupancy
+        self.player = scene.player
+    
+    def prefetch_scene(self, zone):
+        self.scenes.prefetch(zone.target[0])
     
     def input(self):
         if self.awaiting_llm_input or self.in_conversation:
@@ -185,7 +268,7 @@ class Game:
 
         keys = pygame.key.get_just_pressed()
         if keys[pygame.K_SPACE]:
-            for character in self.character_sprites:
+            for character in self.character_sprites.within(self.player.rect.center, 100):
                 if check_connections(100, self.player, character):
                     print("[DEBUG] Connected to NPC:", character.character_data)
                     self.player.block()  # Block movement while in conversation
@@ -253,13 +336,13 @@ class Game:
         self.player.unblock()
         print("[DEBUG] Player unblocked and ready to move")
 
-    def check_monster(self):
-        if [sprite for sprite in self.monster_sprites if sprite.rect.colliderect(self.player.hitbox)] and not self.battle and self.player.direction:
+    def check_monster(self, sprite):
+        if not self.battle and self.player.direction:
             if not self.encounter_timer.active:
                 self.encounter_timer.activate()
     
     def monster_encounter(self):
-        sprites = [sprite for sprite in self.monster_sprites if sprite.rect.colliderect(self.player.hitbox)]
+        sprites = self.trigger_zones.touching(self.monster_sprites)
         if sprites and self.player.direction:
             self.encounter_timer.duration = randint(800, 2500)
             self.player.block()
@@ -332,6 +415,12 @@ class Game:
             "...", self.character_for_llm, self.all_sprites, self.fonts['dialog']
         )
 
+        # The model is still loading in the background, answer with a scripted line instead
+        if not model_loader.ready:
+            print(f"[DEBUG] Model is {model_loader.state}, using a scripted line")
+            self.llm_result = self.scripted_line(self.character_for_llm)
+            return
+
         #Start background LLM call
         def run_llm():
             start_time = time.time()
@@ -345,7 +434,7 @@ class Game:
             print(f"[DEBUG] Mood inferred: {mood}")  # Still useful for dialog, not for battle anymore
 
             # Perform sentiment analysis on the reply FIRST (avoid recalculating it multiple times)
-            sentiment_score = analyzer.polarity_scores(reply)  # Use the pre-initialized analyzer
+            sentiment_score = analyze_sentiment(reply)
             print(f"[DEBUG] Sentiment score for reply: {sentiment_score}")
 
             # If the compound score is negative, trigger battle (before proceeding with the rest)
@@ -397,6 +486,16 @@ class Game:
         self.llm_thread.start()
         self.llm_waiting = True
 
+    def scripted_line(self, character):
+        # cycle through the trainer's written dialog while the model is not ready
+        dialog = character.character_data.get('dialog') or {}
+        lines = dialog.get('defeated' if character.character_data.get('defeated', False) else 'default') or []
+        if not lines:
+            return LLM_FALLBACK_LINE
+        index = getattr(character, 'scripted_index', 0)
+        character.scripted_index = index + 1
+        return lines[index % len(lines)]
+
     def trigger_battle_with_character(self, character):
         # Prevent battle initiation if character is defeated
         if character.character_data.get('defeated', False):
@@ -431,14 +530,12 @@ class Game:
     def no_op_end_dialog(self, character):
         pass
     
-    def transition_check(self):
-        sprites = [sprite for sprite in self.transition_sprites if sprite.rect.colliderect(self.player.hitbox)]
-        if sprites:
-            self.player.block()
-            self.transition_target = sprites[0].target
-            self.tint_mode = 'tint'
+    def transition(self, sprite):
+        self.player.block()
+        self.transition_target = sprite.target
+        self.tint_mode = 'tint'
             
-    def tint_screen(self, dt):
+    def update_tint(self, dt):
         if self.tint_mode == 'untint':
             self.tint_progress -= self.tint_speed * dt
 
@@ -450,18 +547,54 @@ class Game:
                 elif self.transition_target == 'level':
                     self.battle = None
                 else:
-                    self.setup(self.tmx_maps[self.transition_target[0]], self.transition_target[1])
+                    self.enter_scene(*self.transition_target)
                 self.tint_mode = 'untint'
                 self.transition_target = None
 
         self.tint_progress = max(0, min(self.tint_progress, 255))
+    
+    def tint_screen(self):
         self.tint_surf.set_alpha(self.tint_progress)
         self.display_surface.blit(self.tint_surf, (0,0))
     
+    def overlay_active(self):
+        # anything drawn over the world needs the full redraw
+        return bool(self.battle or self.index_open or self.evolution or self.awaiting_llm_input or self.tint_mode == 'tint' or self.tint_progress)
+    
+    def report_startup(self, start):
+        self.profiler.record('first frame', perf_counter() - start)
+        with self.profiler.phase('model construction (background)'):
+            model_loader.wait()
+            for name, duration in model_loader.timings.items():
+                self.profiler.record(name, duration)
+        self.profiler.report()
+        pygame.quit()
+        exit()
+
+    def frame_limit(self):
+        # throttle further while the window is in the background so llama.cpp gets the cpu
+        if not (pygame.key.get_focused() and pygame.display.get_active()):
+            return IDLE_FPS
+        return MAX_FPS
+    
+    def tick(self, dt):
+        # fixed timestep simulation, everything that moves or accumulates over time
+        self.encounter_timer.update()
+        with self.allocations['sprites update']:
+            self.all_sprites.update(dt, self.player.rect.center)
+        with self.allocations['trigger zones']:
+            self.trigger_zones.update(self.player.hitbox)
+        with self.allocations['battle update']:
+            if self.battle: self.battle.update(dt)
+        self.update_tint(dt)
+    
     def run(self):
+        start = perf_counter()
+        step = 1 / TICK_RATE
+        accumulator = 0
         while True:
-            dt = self.clock.tick() / 1000
-            self.display_surface.fill('black')
+            dt = self.clock.tick(self.frame_limit()) / 1000
+            accumulator += min(dt, MAX_FRAME_TIME)
             skip_frame = False
 
             for event in pygame.event.get():
@@ -484,12 +617,17 @@ class Game:
             if skip_frame:
                 continue
             
-            self.encounter_timer.update()
-            self.input()
-            self.transition_check()
-            self.all_sprites.update(dt)
-            self.check_monster()
-            self.all_sprites.draw(self.player)
+            # input once per frame, the just pressed keys would repeat in every tick
+            with self.allocations['input']:
+                self.input()
+                if self.battle: self.battle.input()
+            while accumulator >= step:
+                self.tick(step)
+                accumulator -= step
+            with self.allocations['scene prefetch']:
+                self.scenes.update()
+            with self.allocations['world draw']:
+                dirty_rects = self.all_sprites.draw(self.player, self.dirty_rects and not self.overlay_active(), accumulator / step)
             
             if self.awaiting_llm_input and self.text_input_box:
                 self.text_input_box.draw(self.display_surface)
@@ -513,19 +651,28 @@ class Game:
                 self.llm_result = None
                 
             # overlays 
-            if self.dialog_tree: self.dialog_tree.update()
-            if self.index_open:  self.monster_index.update(dt)
-            if self.battle:      self.battle.update(dt)
-            if self.evolution:   self.evolution.update(dt)
-                
-            self.tint_screen(dt)
-            pygame.display.update()
+            with self.allocations['overlays']:
+                if self.dialog_tree: self.dialog_tree.update()
+                if self.index_open:  self.monster_index.update(dt)
+                if self.battle:      self.battle.draw()
+                if self.evolution:   self.evolution.update(dt)
+                self.tint_screen()
+            
+            with self.allocations['audio and display']:
+                self.audio.update(dt)
+                if dirty_rects is None:
+                    pygame.display.update()
+                else:
+                    pygame.display.update(dirty_rects)
+            self.allocations.frame()
 
-if __name__ == '__main__':
-    game = Game()
-    game.run()
+            if self.profile_startup:
+                self.report_startup(start)
 
 if __name__ == '__main__':
-    game = Game()
+    game = Game(
+        profile_startup = '--profile-startup' in sys.argv,
+        dirty_rects = DIRTY_RECTS or '--dirty-rects' in sys.argv,
+        alloc_report = '--alloc-report' in sys.argv)
     game.run()
         
\ No newline at end of file
@@ -0,0 +1,223 @@
+from settings import *
+from os.path import join, exists, dirname, basename
+from os import walk, makedirs
+import xml.etree.ElementTree as ElementTree
+import hashlib
+import json
+import sys
+import numpy as np
+from asset_pack import asset_key
+
+# one folder per map: map.json with the layers, interned strings and tile atlas, one .npy per layer
+MAP_FORMAT = 1
+OBJECT_DTYPE = np.dtype([
+	('x', 'f8'), ('y', 'f8'), ('width', 'f8'), ('height', 'f8'),
+	('name', 'u4'), ('gid', 'u4'), ('properties', 'u4'), ('property_count', 'u4')])
+PROPERTY_DTYPE = np.dtype([('key', 'u4'), ('value', 'u4')])
+FLIP_NAMES = ('flipped_horizontally', 'flipped_vertically', 'flipped_diagonally')
+
+def map_name(tmx_path):
+	return basename(tmx_path).split('.')[0]
+
+def map_sources(tmx_path):
+	# the tmx itself and the external tilesets it references
+	sources = [asset_key(tmx_path)]
+	for tileset in ElementTree.parse(tmx_path).getroot().iter('tileset'):
+		if 'source' in tileset.attrib:
+			sources.append(asset_key(join(dirname(tmx_path), tileset.attrib['source'])))
+	return sources
+
+def source_hash(sources):
+	sha = hashlib.sha1(f'map format {MAP_FORMAT}'.encode())
+	for source in sources:
+		sha.update(source.encode())
+		with open(source, 'rb') as f:
+			sha.update(f.read())
+	return sha.hexdigest()
+
+def read_header(folder):
+	header_path = join(folder, 'map.json')
+	if not exists(header_path):
+		return {}
+	with open(header_path) as f:
+		return json.load(f)
+
+def atlas_loader(filename, colorkey, **kwargs):
+	# stands in for the pygame loader, records where every tile image comes from instead of loading it
+	def load(rect = None, flags = None):
+		flips = [int(bool(getattr(flags, name, 0))) for name in FLIP_NAMES]
+		return [asset_key(filename), *(rect or (0, 0, 0, 0)), *flips, colorkey or '']
+	return load
+
+class StringTable:
+	# names and property values, each distinct value is stored once
+	def __init__(self):
+		self.values = []
+		self.index = {}
+
+	def intern(self, value):
+		key = json.dumps(value)
+		if key not in self.index:
+			self.index[key] = len(self.values)
+			self.values.append(value)
+		return self.index[key]
+
+def compile_map(tmx_path, root = COMPILED_MAPS_PATH, force = False):
+	from pytmx import TiledMap, TiledTileLayer, TiledObjectGroup
+
+	folder = join(root, map_name(tmx_path))
+	sources = map_sources(tmx_path)
+	digest = source_hash(sources)
+	if not force and read_header(folder).get('hash') == digest:
+		return False
+
+	tmx_map = TiledMap(tmx_path, image_loader = atlas_loader)
+	strings = StringTable()
+	layers, properties = [], []
+	makedirs(folder, exist_ok = True)
+	for index, layer in enumerate(tmx_map.layers):
+		file_name = f'{index}.npy'
+		if isinstance(layer, TiledTileLayer):
+			gid_type = np.uint16 if len(tmx_map.images) <= 2**16 else np.uint32
+			np.save(join(folder, file_name), np.array(layer.data, dtype = gid_type))
+			layers.append([layer.name, 'tiles', file_name])
+		elif isinstance(layer, TiledObjectGroup):
+			objects = np.zeros(len(layer), dtype = OBJECT_DTYPE)
+			for row, obj in enumerate(layer):
+				start = len(properties)
+				properties.extend((strings.intern(key), strings.intern(value)) for key, value in obj.properties.items())
+				objects[row] = (obj.x, obj.y, obj.width, obj.height, strings.intern(obj.name), obj.gid, start, len(properties) - start)
+			np.save(join(folder, file_name), objects)
+			layers.append([layer.name, 'objects', file_name])
+	np.save(join(folder, 'properties.npy'), np.array(properties, dtype = PROPERTY_DTYPE))
+
+	# written last, a folder without a header is ignored by the game
+	header = {
+		'format': MAP_FORMAT, 'hash': digest, 'sources': sources,
+		'width': tmx_map.width, 'height': tmx_map.height,
+		'tilewidth': tmx_map.tilewidth, 'tileheight': tmx_map.tileheight,
+		'layers': layers, 'strings': strings.values, 'atlas': tmx_map.images}
+	with open(join(folder, 'map.json'), 'w') as f:
+		json.dump(header, f)
+	print(f'[INFO] Compiled {tmx_path} into {folder} ({len(layers)} layers, {len(strings.values)} strings)')
+	return True
+
+def compile_maps(*path, root = COMPILED_MAPS_PATH, force = False):
+	for folder_path, _, file_names in walk(join(*path)):
+		for file_name in sorted(file_names):
+			if file_name.endswith('.tmx') and not compile_map(join(folder_path, file_name), root, force):
+				print(f'[INFO] Compiled map {map_name(file_name)} is up to date')
+
+def convert_tile(tile, colorkey):
+	# same format choice as the pytmx pygame loader, so compiled maps draw pixel identical
+	if colorkey:
+		surf = tile.convert()
+		surf.set_colorkey(pygame.Color(f'#{colorkey}'), pygame.RLEACCEL)
+		return surf
+	width, height = tile.get_size()
+	if pygame.mask.from_surface(tile, 254).count() == width * height:
+		return tile.convert()
+	return tile.convert_alpha()
+
+def atlas_image(entry, sources, load_source):
+	# one recorded atlas entry to a converted tile, sources caches the tileset images by path
+	path, x, y, width, height, flip_x, flip_y, flip_diagonal, colorkey = entry
+	if path not in sources:
+		sources[path] = load_source(path)
+	tile = sources[path].subsurface((x, y, width, height)) if width else sources[path].copy()
+	if flip_diagonal:
+		tile = pygame.transform.flip(pygame.transform.rotate(tile, 270), True, False)
+	if flip_x or flip_y:
+		tile = pygame.transform.flip(tile, flip_x, flip_y)
+	return convert_tile(tile, colorkey)
+
+class MapObject:
+	def __init__(self, parent, row):
+		self.parent = parent
+		self.x, self.y, self.width, self.height = float(row['x']), float(row['y']), float(row['width']), float(row['height'])
+		self.name = parent.strings[row['name']]
+		self.gid = int(row['gid'])
+		start = int(row['properties'])
+		self.properties = {parent.strings[key]: parent.strings[value] for key, value in parent.properties[start:start + row['property_count']].tolist()}
+
+	@property
+	def image(self):
+		return self.parent.image(self.gid) if self.gid else None
+
+class TileLayer:
+	def __init__(self, parent, name, data):
+		self.parent = parent
+		self.name = name
+		self.data = data
+
+	def tiles(self):
+		# row by row like pytmx, images are only made for the gids that actually show up
+		ys, xs = np.nonzero(self.data)
+		image = self.parent.image
+		for x, y, gid in zip(xs.tolist(), ys.tolist(), self.data[ys, xs].tolist()):
+			yield x, y, image(gid)
+
+class ObjectLayer:
+	def __init__(self, parent, name, objects):
+		self.parent = parent
+		self.name = name
+		self.objects = objects
+
+	def __iter__(self):
+		for row in self.objects:
+			yield MapObject(self.parent, row)
+
+	def __len__(self):
+		return len(self.objects)
+
+class CompiledMap:
+	# the part of the pytmx map interface the game uses, backed by memory mapped arrays
+	def __init__(self, folder, header, load_source = pygame.image.load):
+		self.folder = folder
+		self.width, self.height = header['width'], header['height']
+		self.tilewidth, self.tileheight = header['tilewidth'], header['tileheight']
+		self.strings = header['strings']
+		self.atlas = header['atlas']
+		self.load_source = load_source
+		self.sources = {}
+		self.images = {}
+		self.properties = np.load(join(folder, 'properties.npy'), mmap_mode = 'r')
+
+		self.layers = []
+		for name, kind, file_name in header['layers']:
+			data = np.load(join(folder, file_name), mmap_mode = 'r')
+			self.layers.append(TileLayer(self, name, data) if kind == 'tiles' else ObjectLayer(self, name, data))
+		# later layers win on duplicate names, same as pytmx
+		self.layernames = {layer.name: layer for layer in self.layers}
+
+	@classmethod
+	def open(cls, tmx_path, load_source = pygame.image.load, root = COMPILED_MAPS_PATH):
+		folder = join(root, map_name(tmx_path))
+		header = read_header(folder)
+		if not header:
+			return None
+		try:
+			fresh = header['format'] == MAP_FORMAT and header['hash'] == source_hash(header['sources'])
+		except (KeyError, OSError):
+			fresh = False
+		if not fresh:
+			print(f'[WARNING] Compiled map {folder} is stale, parsing {tmx_path} instead (run python code/map_compiler.py)')
+			return None
+		return cls(folder, header, load_source)
+
+	def get_layer_by_name(self, name):
+		try:
+			return self.layernames[name]
+		except KeyError:
+			raise ValueError(f'Layer "{name}" not found in {self.folder}')
+
+	def image(self, gid):
+		if gid in self.images:
+			return self.images[gid]
+		entry = self.atlas[gid] if gid < len(self.atlas) else None
+		surf = atlas_image(entry, self.sources, self.load_source) if entry else None
+		self.images[gid] = surf
+		return surf
+
+if __name__ == '__main__':
+	compile_maps('data', 'maps', force = '--force' in sys.argv)
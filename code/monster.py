@@ -1,59 +1,110 @@
-from game_data import MONSTER_DATA, ATTACK_DATA
+from data_tables import ATTACKS, SPECIES, ELEMENTS, get_attack, get_species
+from types import MappingProxyType
 from random import randint
 
+# derived stats per (species, level), shared by every monster with the same pair so they are built once
+DERIVED_STATS = {}
+
+def derived_stats(species, level):
+	key = (species.id, level)
+	if key not in DERIVED_STATS:
+		stats = MappingProxyType({stat: value * level for stat, value in species.stats.items()})
+		summary = MappingProxyType({
+			'health': stats['max_health'],
+			'energy': stats['max_energy'],
+			'attack': stats['attack'],
+			'defense': stats['defense'],
+			'speed': stats['speed'],
+			'recovery': stats['recovery'],
+		})
+		unlocked = tuple(ATTACKS[ability] for lvl, ability in species.abilities if level >= lvl)
+		DERIVED_STATS[key] = (stats, summary, unlocked, tuple(attack.name for attack in unlocked))
+	return DERIVED_STATS[key]
+
 class Monster:
+	# slots keep big monster storages small, derived stats are looked up again only when level or species change
+	__slots__ = (
+		'name', 'species', 'element_id', '_level',
+		'health', 'energy', 'initiative', 'defending', 'xp', 'level_up',
+		'stats', 'stat_summary', 'unlocked', 'ability_names')
+
 	def __init__(self, name, level):
-		self.name, self.level = name, level
-		self.paused = False
+		self.set_species(name, level)
 
 		# stats 
-		self.element = MONSTER_DATA[name]['stats']['element']
-		self.base_stats = MONSTER_DATA[name]['stats']
-		self.health = self.base_stats['max_health'] * self.level
-		self.energy = self.base_stats['max_energy'] * self.level
+		self.health = self.stats['max_health']
+		self.energy = self.stats['max_energy']
 		self.initiative = 0
-		self.abilities = MONSTER_DATA[name]['abilities']
 		self.defending = False
 
 		# experience
 		self.xp = 0
 		self.level_up = self.level * 150
-		self.evolution = MONSTER_DATA[self.name]['evolve']
 
 	def __repr__(self):
 		return f'monster: {self.name}, lvl: {self.level}'
 
+	@property
+	def level(self):
+		return self._level
+
+	@level.setter
+	def level(self, level):
+		self._level = level
+		self.refresh()
+
+	# species data, read straight from the tables instead of being copied onto every monster
+	@property
+	def element(self):
+		return ELEMENTS[self.element_id]
+
+	@property
+	def base_stats(self):
+		return self.species.stats
+
+	@property
+	def abilities(self):
+		return self.species.abilities
+
+	@property
+	def evolution(self):
+		evolve = self.species.evolve
+		return (SPECIES[evolve[0]].name, evolve[1]) if evolve else None
+
+	def set_species(self, name, level = None):
+		self.name = name
+		self.species = get_species(name)
+		self.element_id = self.species.element
+		self.level = self._level if level is None else level
+
+	def refresh(self):
+		self.stats, self.stat_summary, self.unlocked, self.ability_names = derived_stats(self.species, self._level)
+
 	def get_stat(self, stat):
-		return self.base_stats[stat] * self.level
+		return self.stats[stat]
 
 	def get_stats(self):
-		return {
-			'health': self.get_stat('max_health'),
-			'energy': self.get_stat('max_energy'),
-			'attack': self.get_stat('attack'),
-			'defense': self.get_stat('defense'),
-			'speed': self.get_stat('speed'),
-			'recovery': self.get_stat('recovery'),
-		}
+		return self.stat_summary
 
 	def get_abilities(self, all  = True):
 		if all:
-			return [ability for lvl, ability in self.abilities.items() if self.level >= lvl]
+			return self.ability_names
 		else:
-			return [ability for lvl, ability in self.abilities.items() if self.level >= lvl and ATTACK_DATA[ability]['cost'] < self.energy]
+			return [attack.name for attack in self.unlocked if attack.cost < self.energy]
 
 	def get_info(self):
+		# built on every call, health, energy and initiative change every frame, only the maximums are cached
 		return (
-			(self.health, self.get_stat('max_health')),
-			(self.energy, self.get_stat('max_energy')),
+			(self.health, self.stats['max_health']),
+			(self.energy, self.stats['max_energy']),
 			(self.initiative, 100)
 			)
 
 	def reduce_energy(self, attack):
-		self.energy -= ATTACK_DATA[attack]['cost']
+		self.energy -= get_attack(attack).cost
 
 	def get_base_damage(self, attack):
-		return self.get_stat('attack') * ATTACK_DATA[attack]['amount']
+		return self.stats['attack'] * get_attack(attack).amount
 
 	def update_xp(self, amount):
 		if self.level_up - self.xp > amount:
@@ -64,10 +115,5 @@ class Monster:
 			self.level_up = self.level * 150
 
 	def stat_limiter(self):
-		self.health = max(0, min(self.health, self.get_stat('max_health')))
-		self.energy = max(0, min(self.energy, self.get_stat('max_energy')))
-
-	def update(self, dt):
-		self.stat_limiter()
-		if not self.paused:
-			self.initiative += self.get_stat('speed') * dt
\ No newline at end of file
+		self.health = max(0, min(self.health, self.stats['max_health']))
+		self.energy = max(0, min(self.energy, self.stats['max_energy']))
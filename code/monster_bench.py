@@ -0,0 +1,68 @@
+from data_tables import SPECIES
+from monster import Monster
+from time import perf_counter
+from random import Random
+import tracemalloc
+import argparse
+import sys
+
+def read_info(monster):
+	# the way MonsterStatsSprite reads it every frame
+	for value, max_value in monster.get_info():
+		pass
+
+# memory and per frame cost of big monster storages, run with python code/monster_bench.py [--size 10000]
+CALLS = (
+	('get_stat', lambda monster: monster.get_stat('max_health')),
+	('get_stats', lambda monster: monster.get_stats()),
+	('get_info', read_info),
+	('get_abilities', lambda monster: monster.get_abilities()),
+	('get_abilities(all=False)', lambda monster: monster.get_abilities(all = False)),
+)
+
+def build_party(size, seed = 0):
+	rng = Random(seed)
+	return {index: Monster(rng.choice(SPECIES).name, rng.randint(1, 40)) for index in range(size)}
+
+def measure_memory(size, seed = 0):
+	tracemalloc.start()
+	start = tracemalloc.get_traced_memory()[0]
+	build_start = perf_counter()
+	party = build_party(size, seed)
+	duration = perf_counter() - build_start
+	used = tracemalloc.get_traced_memory()[0] - start
+	tracemalloc.stop()
+	return party, used, duration
+
+def measure_calls(party, rounds):
+	monsters = list(party.values())
+	results = {}
+	for name, call in CALLS:
+		start = perf_counter()
+		for _ in range(rounds):
+			for monster in monsters:
+				call(monster)
+		results[name] = len(monsters) * rounds / (perf_counter() - start)
+	return results
+
+def measure_level_ups(party):
+	# update_xp with enough xp for one level, so every call rebuilds the cache
+	monsters = list(party.values())
+	start = perf_counter()
+	for monster in monsters:
+		monster.update_xp(monster.level_up)
+	return len(monsters) / (perf_counter() - start)
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description = 'memory and throughput of Monster for large parties')
+	parser.add_argument('--size', type = int, default = 10000, help = 'monsters in the party')
+	parser.add_argument('--rounds', type = int, default = 10, help = 'calls per monster and method')
+	parser.add_argument('--seed', type = int, default = 0)
+	args = parser.parse_args()
+
+	party, used, duration = measure_memory(args.size, args.seed)
+	print(f'[INFO] {args.size} monsters built in {duration * 1000:.1f} ms')
+	print(f'[INFO] {used / 1024:.1f} KiB traced, {used / args.size:.0f} bytes per monster (object alone {sys.getsizeof(party[0])} bytes)')
+	for name, rate in measure_calls(party, args.rounds).items():
+		print(f'[INFO] {name:<26} {rate / 1e6:6.2f} M calls/s')
+	print(f'[INFO] {"level up":<26} {measure_level_ups(party) / 1e6:6.2f} M calls/s')
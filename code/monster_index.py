@@ -1,6 +1,6 @@
 from settings import * 
 from support import draw_bar
-from game_data import MONSTER_DATA, ATTACK_DATA
+from data_tables import SPECIES, ELEMENTS, get_attack
 
 class MonsterIndex:
 	def __init__(self, monsters, fonts, monster_frames):
@@ -30,13 +30,12 @@ class MonsterIndex:
 
 		# max values 
 		self.max_stats = {}
-		for data in MONSTER_DATA.values():
-			for stat, value in data['stats'].items():
-				if stat != 'element':
-					if stat not in self.max_stats:
-						self.max_stats[stat] = value
-					else:
-						self.max_stats[stat] = value if value > self.max_stats[stat] else self.max_stats[stat]
+		for species in SPECIES:
+			for stat, value in species.stats.items():
+				if stat not in self.max_stats:
+					self.max_stats[stat] = value
+				else:
+					self.max_stats[stat] = value if value > self.max_stats[stat] else self.max_stats[stat]
 		self.max_stats['health'] = self.max_stats.pop('max_health')
 		self.max_stats['energy'] = self.max_stats.pop('max_energy')
 
@@ -200,7 +199,7 @@ class MonsterIndex:
 		self.display_surface.blit(ability_text_surf, ability_text_rect)
 
 		for index, ability in enumerate(monster.get_abilities()):
-			element = ATTACK_DATA[ability]['element']
+			element = ELEMENTS[get_attack(ability).element]
 
 			text_surf = self.fonts['regular'].render(ability, False, COLORS['black'])
 			x = ability_rect.left + index % 2 * ability_rect.width / 2
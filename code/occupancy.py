@@ -0,0 +1,43 @@
+from settings import *
+
+class OccupancyGrid:
+	# one flag per map tile, set where a static collider covers any part of the tile
+	def __init__(self, width, height, rects, tile_size = TILE_SIZE):
+		self.width, self.height = width, height
+		self.tile_size = tile_size
+		self.blocked = bytearray(width * height)
+		for rect in rects:
+			left, top = max(int(rect.left // tile_size), 0), max(int(rect.top // tile_size), 0)
+			right, bottom = min(int((rect.right - 1) // tile_size), width - 1), min(int((rect.bottom - 1) // tile_size), height - 1)
+			for y in range(top, bottom + 1):
+				self.blocked[y * width + left:y * width + right + 1] = b'\x01' * (right - left + 1)
+
+	def tile(self, pos):
+		return int(pos[0] // self.tile_size), int(pos[1] // self.tile_size)
+
+	def is_blocked(self, x, y):
+		return not (0 <= x < self.width and 0 <= y < self.height) or bool(self.blocked[y * self.width + x])
+
+	def line_of_sight(self, start, end):
+		# grid traversal (amanatides & woo) from start to end, the tiles both ends stand on are not tested
+		x0, y0 = start[0] / self.tile_size, start[1] / self.tile_size
+		x1, y1 = end[0] / self.tile_size, end[1] / self.tile_size
+		x, y = int(x0 // 1), int(y0 // 1)
+		end_x, end_y = int(x1 // 1), int(y1 // 1)
+		dx, dy = x1 - x0, y1 - y0
+		step_x, step_y = (1 if dx > 0 else -1), (1 if dy > 0 else -1)
+		delta_x = abs(1 / dx) if dx else float('inf')
+		delta_y = abs(1 / dy) if dy else float('inf')
+		max_x = ((x + 1 - x0) if dx > 0 else (x0 - x)) * delta_x if dx else float('inf')
+		max_y = ((y + 1 - y0) if dy > 0 else (y0 - y)) * delta_y if dy else float('inf')
+
+		for _ in range(abs(end_x - x) + abs(end_y - y) - 1):
+			if max_x < max_y:
+				x += step_x
+				max_x += delta_x
+			else:
+				y += step_y
+				max_y += delta_y
+			if self.is_blocked(x, y):
+				return False
+		return True
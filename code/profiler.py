@@ -0,0 +1,107 @@
+from settings import *
+from contextlib import contextmanager
+from time import perf_counter
+import tracemalloc
+import gc
+
+class Phase:
+	def __init__(self, name):
+		self.name = name
+		self.duration = 0
+		self.children = []
+
+class StartupProfiler:
+	def __init__(self):
+		self.root = Phase('total')
+		self.stack = [self.root]
+
+	@contextmanager
+	def phase(self, name):
+		phase = Phase(name)
+		self.stack[-1].children.append(phase)
+		self.stack.append(phase)
+		start = perf_counter()
+		try:
+			yield phase
+		finally:
+			phase.duration = perf_counter() - start
+			self.stack.pop()
+
+	def record(self, name, duration):
+		phase = Phase(name)
+		phase.duration = duration
+		self.stack[-1].children.append(phase)
+		return phase
+
+	def lines(self, phase = None, depth = 0):
+		phase = phase or self.root
+		for child in phase.children:
+			yield f"{'  ' * depth}{child.name:<{32 - 2 * depth}} {child.duration * 1000:9.1f} ms"
+			yield from self.lines(child, depth + 1)
+
+	def report(self, title = 'startup', phase = None):
+		print(f'[INFO] {title} timings')
+		for line in self.lines(phase):
+			print(f'[INFO]   {line}')
+
+class AllocationSection:
+	# net and peak traced bytes of one subsystem, summed over the report window
+	def __init__(self, name):
+		self.name = name
+		self.start = 0
+		self.net = 0
+		self.peak = 0
+
+	def __enter__(self):
+		tracemalloc.reset_peak()
+		self.start = tracemalloc.get_traced_memory()[0]
+
+	def __exit__(self, *exc):
+		current, peak = tracemalloc.get_traced_memory()
+		self.net += current - self.start
+		self.peak += peak - self.start
+
+class NullSection:
+	def __enter__(self):
+		pass
+
+	def __exit__(self, *exc):
+		pass
+
+class AllocationReport:
+	# debug mode for the game loop, prints per frame allocation averages every few hundred frames
+	def __init__(self, enabled = False, frames = ALLOC_REPORT_FRAMES):
+		self.enabled = enabled
+		self.frames = frames
+		self.count = 0
+		self.sections = {}
+		self.null = NullSection()
+		if enabled:
+			tracemalloc.start()
+			self.collections = self.gc_collections()
+
+	def __getitem__(self, name):
+		if not self.enabled:
+			return self.null
+		if name not in self.sections:
+			self.sections[name] = AllocationSection(name)
+		return self.sections[name]
+
+	def gc_collections(self):
+		return [stats['collections'] for stats in gc.get_stats()]
+
+	def frame(self):
+		if not self.enabled:
+			return
+		self.count += 1
+		if self.count >= self.frames:
+			self.report()
+
+	def report(self):
+		collections = self.gc_collections()
+		gc_runs = ', '.join(f'gen{gen} {now - before}' for gen, (now, before) in enumerate(zip(collections, self.collections)))
+		print(f'[INFO] allocations per frame over {self.count} frames (gc runs: {gc_runs})')
+		for section in self.sections.values():
+			print(f'[INFO]   {section.name:<24} peak {section.peak / self.count:9.0f} B  net {section.net / self.count:+9.0f} B')
+			section.net = section.peak = 0
+		self.count, self.collections = 0, collections
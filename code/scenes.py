@@ -0,0 +1,120 @@
+from settings import *
+from collections import OrderedDict
+from time import perf_counter, sleep
+from groups import AllSprites, SpatialGroup
+from triggers import TriggerZones
+from asset_loader import AssetDecoder
+
+# yielded by a scene build that is waiting on the map parser thread
+WAITING = 'waiting'
+
+class Scene:
+	# every sprite group of one map, kept alive while the player is elsewhere
+	def __init__(self, name, shadow_surf, noticed_surf):
+		self.name = name
+		self.all_sprites = AllSprites(shadow_surf, noticed_surf)
+		self.collision_sprites = SpatialGroup(COLLISION_CELL_SIZE, 'hitbox')
+		self.character_sprites = SpatialGroup(COLLISION_CELL_SIZE)
+		self.transition_sprites = pygame.sprite.Group()
+		self.monster_sprites = pygame.sprite.Group()
+		self.trigger_zones = TriggerZones()
+		self.occupancy = None
+		self.player = None
+		self.starts = {}
+
+	def release(self):
+		# the baked terrain is most of a scene's memory, free it now instead of whenever the sprite cycles are collected
+		if self.all_sprites.terrain:
+			self.all_sprites.terrain.release()
+
+	def place_player(self, start_pos):
+		pos, facing_direction = self.starts[start_pos]
+		self.player.teleport(pos, facing_direction)
+		self.all_sprites.reset_motion()
+		self.trigger_zones.reset()
+
+class PrefetchZone:
+	# area around a transition, walking into it starts building the target scene
+	def __init__(self, transition, radius = PREFETCH_RADIUS):
+		self.rect = transition.rect.inflate(radius * 2, radius * 2)
+		self.target = transition.target
+
+class SceneCache:
+	def __init__(self, tmx_maps, build, size = SCENE_CACHE_SIZE, budget = PREFETCH_BUDGET):
+		self.tmx_maps = tmx_maps
+		self.build = build
+		self.size = size
+		self.budget = budget
+		self.scenes = OrderedDict()
+		self.pending = OrderedDict()
+		self.failed = set()
+		self.current = None
+		self.decoder = None
+
+	def load_map(self, name):
+		tmx_map = self.tmx_maps.load_compiled(name)
+		if tmx_map:
+			return tmx_map
+		# parsed and decoded on a worker thread, the tiles are converted on the main thread a batch per step
+		self.decoder = self.decoder or AssetDecoder(1)
+		path = self.tmx_maps.paths[name]
+		self.decoder.submit_map(path, atlas = True)
+		while not self.decoder.ready(path):
+			yield WAITING
+		tmx_map = yield from self.decoder.tmx_batches(path)
+		return self.tmx_maps.store(name, tmx_map)
+
+	def steps(self, name):
+		tmx_map = yield from self.load_map(name)
+		# compiled maps open without waiting, so give the build its own slice
+		yield
+		scene = yield from self.build(name, tmx_map)
+		return scene
+
+	def store(self, name, scene):
+		self.scenes[name] = scene
+		self.failed.discard(name)
+		while len(self.scenes) > self.size:
+			# the scene being played is never evicted
+			evicted = next(key for key in self.scenes if key != self.current)
+			self.scenes.pop(evicted).release()
+			print(f'[DEBUG] Evicted scene {evicted} from the scene cache')
+
+	def get(self, name):
+		self.current = name
+		if name in self.scenes:
+			self.scenes.move_to_end(name)
+			return self.scenes[name]
+
+		# finish a prefetch that is still running, or build the scene right now
+		steps = self.pending.pop(name, None) or self.steps(name)
+		try:
+			while True:
+				if next(steps) == WAITING:
+					sleep(0.001)
+		except StopIteration as finished:
+			scene = finished.value
+		self.store(name, scene)
+		return scene
+
+	def prefetch(self, name):
+		# a map that failed to build is only built again by a real transition, which then raises
+		if name not in self.scenes and name not in self.pending and name not in self.failed:
+			self.pending[name] = self.steps(name)
+
+	def update(self):
+		# advances the pending builds for at most budget seconds per frame
+		start = perf_counter()
+		while self.pending and perf_counter() - start < self.budget:
+			name, steps = next(iter(self.pending.items()))
+			try:
+				if next(steps) == WAITING:
+					break
+			except StopIteration as finished:
+				del self.pending[name]
+				self.store(name, finished.value)
+				print(f'[DEBUG] Prefetched scene {name}')
+			except Exception as error:
+				del self.pending[name]
+				self.failed.add(name)
+				print(f'[WARNING] Prefetch of scene {name} failed ({error!r}), it is built again on entry')
@@ -1,12 +1,71 @@
 import pygame
 from pygame.math import Vector2 as vector 
 from sys import exit
+from os.path import join
+from os import cpu_count
 
 WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
 TILE_SIZE = 64 
+TERRAIN_CHUNK_SIZE = 16
+
+# AllSprites only draws sprites in the camera rect grown by the margin
+CULL_CELL_SIZE = TILE_SIZE * 4
+CULL_MARGIN = TILE_SIZE
+SHADOW_OFFSET = vector(40, 110)
+
+# sprites further than this outside the screen stop updating until the player comes close
+ACTIVITY_MARGIN = TILE_SIZE * 4
+
+# grid for the collision and npc lookups
+COLLISION_CELL_SIZE = TILE_SIZE * 2
+
+# dirty rect mode only redraws what changed while the camera stands still,
+# above this share of the screen a full redraw is cheaper
+DIRTY_RECTS = False
+DIRTY_RECT_LIMIT = 0.5
+
+# frame cap, lower while the window is unfocused, and the fixed simulation rate
+MAX_FPS = 60
+IDLE_FPS = 10
+TICK_RATE = 60
+MAX_FRAME_TIME = 0.25
+
+# --alloc-report prints traced allocations per subsystem every this many frames
+ALLOC_REPORT_FRAMES = 300
 ANIMATION_SPEED = 6
 BATTLE_OUTLINE_WIDTH = 4
 
+# asset pack built by asset_pack.py, decoded frames as raw pixels
+ASSET_PACK_PATH = join('data', 'assets.pack')
+
+# maps compiled by map_compiler.py, one folder of memory mapped arrays per map
+COMPILED_MAPS_PATH = join('data', 'compiled')
+
+# decode images, audio and maps on a worker pool during import_assets
+PARALLEL_LOADING = True
+LOADER_WORKERS = cpu_count() or 4
+# graphics the startup importers read, in the order they read them
+LOADER_IMAGES = (
+	('tilesets', 'water'), ('tilesets', 'coast.png'), ('characters',), ('other', 'shadow.png'),
+	('icons',), ('monsters',), ('ui',), ('attacks',), ('backgrounds',), ('other', 'star animation'))
+
+# maps are parsed on demand, this many stay resident
+START_MAP = 'world'
+MAP_CACHE_SIZE = 3
+
+# built scenes kept for revisits, and the prefetch that builds the next one near a transition
+SCENE_CACHE_SIZE = 3
+PREFETCH_RADIUS = TILE_SIZE * 4
+PREFETCH_BUDGET = 0.004
+# a scene build yields after this many map objects, and map tiles are converted in batches of about this many pixels
+PREFETCH_SLICE_OBJECTS = 8
+PREFETCH_SLICE_PIXELS = 64 * TILE_SIZE * TILE_SIZE
+
+# music is streamed, effects are decoded on first play up to the memory limit
+MUSIC_TRACKS = ('overworld', 'battle', 'evolution')
+MUSIC_FADE_MS = 600
+SOUND_MEMORY_LIMIT = 8 * 2**20
+
 # global prompt
 GLOBAL_SYSTEM_PROMPT = (
     "You are a living character in a fantasy RPG world. "
@@ -15,6 +74,12 @@ GLOBAL_SYSTEM_PROMPT = (
     "You will not use swear words or cuss words or any explicit language when expressing anger or negative emotions"
 )
 
+# sent once while the model warms up in the background
+LLM_WARMUP_PROMPT = "[INST] Say hello. [/INST]"
+
+# said by an npc when the player talks to them before the model is ready
+LLM_FALLBACK_LINE = "Hmm... give me a moment to gather my thoughts."
+
 BAD_OUTPUT_KEYWORDS = [
     "I am an AI", "as an AI", "I am a chatbot", "I am a program",
     "I am artificial", "I do not have a name", "As a language model",
@@ -0,0 +1,58 @@
+from settings import *
+import numpy as np
+
+# the old outlines blitted the white frame at these eight offsets (in units of the width)
+OUTLINE_OFFSETS = ((0,0), (1,0), (2,0), (2,1), (2,2), (1,2), (0,2), (0,1))
+
+def opaque(frame):
+	# (w, h) bool array, same test as pygame.mask.from_surface: the colorkey if set, else alpha > 127
+	if frame.get_colorkey() is not None:
+		return pygame.surfarray.array_colorkey(frame) > 127
+	return pygame.surfarray.array_alpha(frame) > 127
+
+def alpha_masks(frames):
+	return np.stack([opaque(frame) for frame in frames])
+
+def dilate(masks, width):
+	n, w, h = masks.shape
+	out = np.zeros((n, w + width * 2, h + width * 2), dtype = bool)
+	for x, y in OUTLINE_OFFSETS:
+		out[:, x * width:x * width + w, y * width:y * width + h] |= masks
+	return out
+
+def white_surfaces(masks):
+	# per pixel alpha surfaces, opaque white where the mask is set
+	n, w, h = masks.shape
+	rgba = np.zeros((n, h, w, 4), dtype = np.uint8)
+	rgba[masks.transpose(0, 2, 1)] = 255
+	convert = pygame.display.get_surface() is not None
+	surfs = []
+	for i in range(n):
+		surf = pygame.image.frombytes(rgba[i].tobytes(), (w, h), 'RGBA')
+		surfs.append(surf.convert_alpha() if convert else surf)
+	return surfs
+
+def silhouette(frame):
+	# white on a black colorkey, like mask.to_surface() with set_colorkey('black')
+	surf = pygame.Surface(frame.get_size())
+	pygame.surfarray.pixels3d(surf)[opaque(frame)] = 255
+	surf.set_colorkey('black')
+	return surf
+
+def silhouettes(frame_dict):
+	return {state: [silhouette(frame) for frame in frames] for state, frames in frame_dict.items()}
+
+def outline_frames(frame_dict, width):
+	# one dilation pass per frame size over every frame of every monster
+	batches = {}
+	for monster, monster_frames in frame_dict.items():
+		for state, frames in monster_frames.items():
+			for index, frame in enumerate(frames):
+				batches.setdefault(frame.get_size(), []).append((monster, state, index, frame))
+
+	outline_frame_dict = {monster: {state: [None] * len(frames) for state, frames in monster_frames.items()} for monster, monster_frames in frame_dict.items()}
+	for batch in batches.values():
+		surfs = white_surfaces(dilate(alpha_masks([frame for *_, frame in batch]), width))
+		for (monster, state, index, _), surf in zip(batch, surfs):
+			outline_frame_dict[monster][state][index] = surf
+	return outline_frame_dict
@@ -0,0 +1,138 @@
+from settings import *
+from os import walk
+from collections import OrderedDict
+from collections.abc import Mapping
+
+class MusicTrack:
+	# long tracks are streamed through pygame.mixer.music instead of decoded up front
+	def __init__(self, bank, name, path):
+		self.bank = bank
+		self.name = name
+		self.path = path
+		self.volume = 1
+
+	def play(self, loops = 0):
+		self.bank.play_music(self, loops)
+
+	def stop(self):
+		self.bank.stop_music(self)
+
+	def set_volume(self, volume):
+		self.volume = volume
+		if self.bank.current_track == self and not self.bank.fading:
+			pygame.mixer.music.set_volume(volume)
+
+class LazySound:
+	# short effects are decoded on the first play and may be dropped again by the bank
+	def __init__(self, bank, name, path):
+		self.bank = bank
+		self.name = name
+		self.path = path
+		self.volume = 1
+		self.sound = None
+		self.size = 0
+
+	def play(self, loops = 0):
+		return self.bank.load(self).play(loops)
+
+	def stop(self):
+		if self.sound:
+			self.sound.stop()
+
+	def set_volume(self, volume):
+		self.volume = volume
+		if self.sound:
+			self.sound.set_volume(volume)
+
+class SoundBank(Mapping):
+	def __init__(self, *path, music = MUSIC_TRACKS, memory_limit = SOUND_MEMORY_LIMIT, fade_ms = MUSIC_FADE_MS):
+		self.handles = {}
+		for folder_path, _, file_names in walk(join(*path)):
+			for file_name in file_names:
+				name = file_name.split('.')[0]
+				handle = MusicTrack if name in music else LazySound
+				self.handles[name] = handle(self, name, join(folder_path, file_name))
+
+		# effects
+		self.loaded = OrderedDict()
+		self.memory = 0
+		self.memory_limit = memory_limit
+
+		# music
+		self.fade_ms = fade_ms
+		self.current_track = None
+		self.next_track = None
+		self.fading = False
+
+	def __getitem__(self, name):
+		return self.handles[name]
+
+	def __iter__(self):
+		return iter(self.handles)
+
+	def __len__(self):
+		return len(self.handles)
+
+	# effects
+	def load(self, handle):
+		if handle.sound:
+			self.loaded.move_to_end(handle.name)
+			return handle.sound
+
+		handle.sound = pygame.mixer.Sound(handle.path)
+		handle.sound.set_volume(handle.volume)
+		frequency, size, channels = pygame.mixer.get_init()
+		handle.size = int(handle.sound.get_length() * frequency * channels * abs(size) // 8)
+		self.loaded[handle.name] = handle
+		self.memory += handle.size
+		self.evict()
+		return handle.sound
+
+	def evict(self):
+		for name, handle in list(self.loaded.items())[:-1]:
+			if self.memory <= self.memory_limit:
+				break
+			if not handle.sound.get_num_channels():
+				del self.loaded[name]
+				self.memory -= handle.size
+				handle.sound = None
+
+	# music
+	def play_music(self, track, loops):
+		if self.current_track == track and pygame.mixer.music.get_busy():
+			if self.fading and self.next_track is None:
+				self.fading = False
+				pygame.mixer.music.set_volume(track.volume)
+			return
+
+		if self.current_track and pygame.mixer.music.get_busy():
+			# fade the old track out first, update() starts this one once it is silent
+			self.next_track = (track, loops)
+			self.fading = True
+		else:
+			self.start_track(track, loops)
+
+	def stop_music(self, track):
+		if self.next_track and self.next_track[0] == track:
+			self.next_track = None
+		elif self.current_track == track:
+			self.fading = True
+
+	def start_track(self, track, loops):
+		pygame.mixer.music.load(track.path)
+		pygame.mixer.music.set_volume(track.volume)
+		pygame.mixer.music.play(loops, fade_ms = self.fade_ms)
+		self.current_track, self.next_track, self.fading = track, None, False
+
+	def update(self, dt):
+		if not self.fading:
+			return
+
+		volume = pygame.mixer.music.get_volume() - self.current_track.volume * dt * 1000 / max(self.fade_ms, 1)
+		if volume > 0 and pygame.mixer.music.get_busy():
+			pygame.mixer.music.set_volume(volume)
+		elif self.next_track:
+			self.start_track(*self.next_track)
+		else:
+			pygame.mixer.music.stop()
+			self.current_track, self.fading = None, False
@@ -0,0 +1,57 @@
+class SpatialHash:
+	# uniform grid of cells, each item is stored in every cell its rect touches
+	def __init__(self, cell_size):
+		self.cell_size = cell_size
+		self.cells = {}
+		self.items = {}
+
+	def cell_range(self, rect):
+		size = self.cell_size
+		return int(rect.left // size), int(rect.top // size), int((rect.right - 1) // size), int((rect.bottom - 1) // size)
+
+	def insert(self, item, rect):
+		cells = self.cell_range(rect)
+		self.items[item] = cells
+		left, top, right, bottom = cells
+		for cy in range(top, bottom + 1):
+			for cx in range(left, right + 1):
+				self.cells.setdefault((cx, cy), {})[item] = None
+
+	def remove(self, item):
+		cells = self.items.pop(item, None)
+		if cells is None:
+			return
+		left, top, right, bottom = cells
+		for cy in range(top, bottom + 1):
+			for cx in range(left, right + 1):
+				cell = self.cells[(cx, cy)]
+				del cell[item]
+				if not cell:
+					del self.cells[(cx, cy)]
+
+	def move(self, item, rect):
+		# only touches the grid when the item crosses into other cells
+		if self.items.get(item) != self.cell_range(rect):
+			self.remove(item)
+			self.insert(item, rect)
+
+	def query(self, rect):
+		found = set()
+		left, top, right, bottom = self.cell_range(rect)
+		cells = self.cells
+		for cy in range(top, bottom + 1):
+			for cx in range(left, right + 1):
+				cell = cells.get((cx, cy))
+				if cell:
+					found.update(cell)
+		return found
+
+	def clear(self):
+		self.cells.clear()
+		self.items.clear()
+
+	def __contains__(self, item):
+		return item in self.items
+
+	def __len__(self):
+		return len(self.items)
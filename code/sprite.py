@@ -1,6 +1,7 @@
 from settings import *
 from random import uniform
 from support import draw_bar
+from silhouette import silhouettes
 from timer import Timer
 
 class Sprite(pygame.sprite.Sprite):
@@ -48,6 +49,20 @@ class AnimatedSprite(Sprite):
         
     def update(self, dt):
         self.animate(dt)
+
+class ClockedSprite(Sprite):
+    # no update of its own, the image always comes from the shared clock
+    def __init__(self, pos, clock, groups, z = WORLD_LAYERS['main']):
+        self.clock = clock
+        super(). __init__(pos, clock.image, groups, z)
+    
+    @property
+    def image(self):
+        return self.clock.image
+    
+    @image.setter
+    def image(self, surf):
+        pass
         
 # battle sprites 
 class MonsterSprite(pygame.sprite.Sprite):
@@ -61,6 +76,7 @@ class MonsterSprite(pygame.sprite.Sprite):
 		self.animation_speed = ANIMATION_SPEED + uniform(-1, 1)
 		self.z = BATTLE_LAYERS['monster']
 		self.highlight = False
+		self.highlight_frames = None
 		self.target_sprite = None
 		self.current_attack = None
 		self.apply_attack = apply_attack
@@ -80,16 +96,16 @@ class MonsterSprite(pygame.sprite.Sprite):
 	def animate(self, dt):
 		self.frame_index += ANIMATION_SPEED * dt
 		if self.state == 'attack' and self.frame_index >= len(self.frames['attack']):
-			self.apply_attack(self.target_sprite, self.current_attack, self.monster.get_base_damage(self.current_attack))
+			self.apply_attack(self.target_sprite, self.current_attack)
 			self.state = 'idle'
 
 		self.adjusted_frame_index = int(self.frame_index % len(self.frames[self.state]))
 		self.image = self.frames[self.state][self.adjusted_frame_index]
 
 		if self.highlight:
-			white_surf = pygame.mask.from_surface(self.image).to_surface()
-			white_surf.set_colorkey('black')
-			self.image = white_surf
+			if not self.highlight_frames:
+				self.highlight_frames = silhouettes(self.frames)
+			self.image = self.highlight_frames[self.state][self.adjusted_frame_index]
 
 	def set_highlight(self, value):
 		self.highlight = value
@@ -101,7 +117,6 @@ class MonsterSprite(pygame.sprite.Sprite):
 		self.frame_index = 0
 		self.target_sprite = target_sprite
 		self.current_attack = attack
-		self.monster.reduce_energy(attack)
 
 	def delayed_kill(self, new_monster):
 		if not self.timers['kill'].active:
@@ -117,7 +132,6 @@ class MonsterSprite(pygame.sprite.Sprite):
 		for timer in self.timers.values():
 			timer.update()
 		self.animate(dt)
-		self.monster.update(dt)
 
 class MonsterOutlineSprite(pygame.sprite.Sprite):
 	def __init__(self, monster_sprite, groups, frames):
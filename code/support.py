@@ -1,21 +1,48 @@
 from settings import *
 from os.path import join
 from os import walk
-from pytmx.util_pygame import load_pygame
+from collections import OrderedDict
+from collections.abc import Mapping
+from asset_pack import AssetPack
+from asset_loader import load_tmx
+from map_compiler import CompiledMap
+from silhouette import outline_frames
+from sound_bank import SoundBank
+
+# asset sources, checked before decoding a file on the main thread
+asset_pack = None
+asset_decoder = None
+
+def use_asset_pack(pack_path = ASSET_PACK_PATH):
+	global asset_pack
+	asset_pack = AssetPack.open(pack_path)
+	return asset_pack
+
+def use_asset_decoder(decoder):
+	global asset_decoder
+	asset_decoder = decoder
+
+def source_image(full_path):
+	surf = asset_pack.image(full_path) if asset_pack else None
+	if surf is None and asset_decoder:
+		surf = asset_decoder.image(full_path)
+	return pygame.image.load(full_path) if surf is None else surf
+
+def load_image(full_path, alpha = True):
+	surf = source_image(full_path)
+	return surf.convert_alpha() if alpha else surf.convert()
 
 # import functions
 def import_image(*path, alpha = True, format = 'png'):
 	full_path = join(*path) + f'.{format}'
-	surf = pygame.image.load(full_path).convert_alpha() if alpha else pygame.image.load(full_path).convert()
-	return surf
+	return load_image(full_path, alpha)
 
 def import_folder(*path):
 	frames = []
 	for folder_path, sub_folders, image_names in walk(join(*path)):
 		for image_name in sorted(image_names, key = lambda name: int(name.split('.')[0])):
 			full_path = join(folder_path, image_name)
-			surf = pygame.image.load(full_path).convert_alpha()
-			frames.append(surf)
+			frames.append(load_image(full_path))
 	return frames
 
 def import_folder_dict(*path):
@@ -23,8 +50,7 @@ def import_folder_dict(*path):
 	for folder_path, sub_folders, image_names in walk(join(*path)):
 		for image_name in image_names:
 			full_path = join(folder_path, image_name)
-			surf = pygame.image.load(full_path).convert_alpha()
-			frames[image_name.split('.')[0]] = surf
+			frames[image_name.split('.')[0]] = load_image(full_path)
 	return frames
 
 def import_sub_folders(*path):
@@ -36,6 +62,10 @@ def import_sub_folders(*path):
 	return frames
 
 def import_tilemap(cols, rows, *path):
+	frames = asset_pack.tilemap(join(*path) + '.png', cols, rows) if asset_pack else None
+	if frames is not None:
+		return frames
+
 	frames = {}
 	surf = import_image(*path)
 	cell_width, cell_height = surf.get_width() / cols, surf.get_height() / rows
@@ -81,12 +111,57 @@ def coast_importer(cols, rows, *path):
     
     return new_dict
 
-def tmx_importer(*path):
-	tmx_dict = {}
+class TmxMaps(Mapping):
+	# loads a map the first time it is asked for and keeps the most recent ones
+	def __init__(self, paths, size = MAP_CACHE_SIZE):
+		self.paths = paths
+		self.size = size
+		self.loaded = OrderedDict()
+		self.stale = set()
+
+	def __getitem__(self, name):
+		tmx_map = self.load_compiled(name)
+		if tmx_map:
+			return tmx_map
+
+		full_path = self.paths[name]
+		tmx_map = asset_decoder.tmx(full_path) if asset_decoder else None
+		return self.store(name, tmx_map or load_tmx(full_path))
+
+	def load_compiled(self, name):
+		# a loaded map or a compiled one, both are ready without parsing any xml
+		if name in self.loaded:
+			self.loaded.move_to_end(name)
+			return self.loaded[name]
+		if name in self.stale:
+			return None
+		tmx_map = CompiledMap.open(self.paths[name], source_image)
+		if tmx_map is None:
+			self.stale.add(name)
+			return None
+		return self.store(name, tmx_map)
+
+	def store(self, name, tmx_map):
+		# also used by the scene prefetch, which parses maps off the main thread
+		self.loaded[name] = tmx_map
+		self.loaded.move_to_end(name)
+		while len(self.loaded) > self.size:
+			evicted, _ = self.loaded.popitem(last = False)
+			print(f'[DEBUG] Evicted map {evicted} from the map cache')
+		return tmx_map
+
+	def __iter__(self):
+		return iter(self.paths)
+
+	def __len__(self):
+		return len(self.paths)
+
+def tmx_importer(*path, size = MAP_CACHE_SIZE):
+	paths = {}
 	for folder_path, sub_folders, file_names in walk(join(*path)):
 		for file in file_names:
-			tmx_dict[file.split('.')[0]] = load_pygame(join(folder_path, file))
-	return tmx_dict
+			paths[file.split('.')[0]] = join(folder_path, file)
+	return TmxMaps(paths, size)
 
 def monster_importer(cols, rows, *path):
 	monster_dict = {}
@@ -100,27 +175,7 @@ def monster_importer(cols, rows, *path):
 	return monster_dict
 
 def outline_creator(frame_dict, width):
-	outline_frame_dict = {}
-	for monster, monster_frames in frame_dict.items():
-		outline_frame_dict[monster] = {}
-		for state, frames in monster_frames.items():
-			outline_frame_dict[monster][state] = []
-			for frame in frames:
-				new_surf = pygame.Surface(vector(frame.get_size()) + vector(width * 2), pygame.SRCALPHA)
-				new_surf.fill((0,0,0,0))
-				white_frame = pygame.mask.from_surface(frame).to_surface()
-				white_frame.set_colorkey('black')
-
-				new_surf.blit(white_frame, (0,0))
-				new_surf.blit(white_frame, (width,0))
-				new_surf.blit(white_frame, (width * 2,0))
-				new_surf.blit(white_frame, (width * 2,width))
-				new_surf.blit(white_frame, (width * 2,width * 2))
-				new_surf.blit(white_frame, (width,width * 2))
-				new_surf.blit(white_frame, (0,width * 2))
-				new_surf.blit(white_frame, (0,width))
-				outline_frame_dict[monster][state].append(new_surf)
-	return outline_frame_dict
+	return outline_frames(frame_dict, width)
 
 def attack_importer(*path):
 	attack_dict = {}
@@ -131,12 +186,7 @@ def attack_importer(*path):
 	return attack_dict
 
 def audio_importer(*path):
-	files = {}
-	for folder_path, _, file_names in walk(join(*path)):
-		for file_name in file_names:
-			full_path = join(folder_path, file_name)
-			files[file_name.split('.')[0]] = pygame.mixer.Sound(full_path)
-	return files
+	return SoundBank(*path)
 
 # game functions
 
@@ -149,10 +199,13 @@ def draw_bar(surface, rect, value, max_value, color, bg_color, radius = 1):
 	pygame.draw.rect(surface, color, progress_rect, 0, radius)
 
 def check_connections(radius, entity, target, tolerance = 30):
-    relation = vector(target.rect.center) - vector(entity.rect.center)
-    if relation.length() < radius:
-        if entity.facing_direction == 'left' and relation.x < 0 and abs(relation.y) < tolerance or\
-            entity.facing_direction == 'right' and relation.x > 0 and abs(relation.y) < tolerance or\
-            entity.facing_direction == 'up' and relation.y < 0 and abs(relation.x) < tolerance or\
-            entity.facing_direction == 'down' and relation.y > 0 and abs(relation.x) < tolerance:
-        		return True
\ No newline at end of file
+    # plain floats instead of vectors, this runs for every npc each tick
+    dx = target.rect.centerx - entity.rect.centerx
+    dy = target.rect.centery - entity.rect.centery
+    if dx * dx + dy * dy < radius * radius:
+        facing = entity.facing_direction
+        if facing == 'left' and dx < 0 and abs(dy) < tolerance or\
+            facing == 'right' and dx > 0 and abs(dy) < tolerance or\
+            facing == 'up' and dy < 0 and abs(dx) < tolerance or\
+            facing == 'down' and dy > 0 and abs(dx) < tolerance:
+            return True
\ No newline at end of file
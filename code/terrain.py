@@ -0,0 +1,61 @@
+from settings import *
+
+class TerrainChunks:
+	# static tile layers baked into chunk surfaces, only the chunks overlapping the camera get blitted
+	def __init__(self, tmx_map = None, layers = (), chunk_size = TERRAIN_CHUNK_SIZE):
+		self.chunk_size = chunk_size
+		self.chunk_pixels = chunk_size * TILE_SIZE
+		self.chunks = {}
+		if tmx_map:
+			for _ in self.bake(tmx_map, layers): pass
+
+	def bake(self, tmx_map, layers, slice_size = 64):
+		# yields every few dozen tiles and after each new chunk surface, so a scene can be built across several frames
+		chunk_size = self.chunk_size
+		covered = {}
+		for layer in layers:
+			for index, (x, y, surf) in enumerate(tmx_map.get_layer_by_name(layer).tiles(), 1):
+				key = (x // chunk_size, y // chunk_size)
+				if key not in self.chunks:
+					# the new surface gets a step of its own, after the tiles blitted so far
+					yield
+					self.chunks[key] = self.chunk_surface(key, tmx_map)
+					covered[key] = set()
+					yield
+				cell = (x % chunk_size, y % chunk_size)
+				self.chunks[key].blit(surf, (cell[0] * TILE_SIZE, cell[1] * TILE_SIZE))
+				if self.opaque(surf):
+					covered[key].add(cell)
+				if index % slice_size == 0:
+					yield
+
+		# chunks without a single see-through pixel drop their alpha channel, opaque blits are much cheaper
+		for key, cells in covered.items():
+			chunk = self.chunks[key]
+			if len(cells) * TILE_SIZE * TILE_SIZE == chunk.get_width() * chunk.get_height():
+				self.chunks[key] = chunk.convert()
+				yield
+
+	def chunk_surface(self, key, tmx_map):
+		# chunks on the right and bottom edge are cut to the map instead of allocating a full chunk
+		width = min(self.chunk_pixels, tmx_map.width * TILE_SIZE - key[0] * self.chunk_pixels)
+		height = min(self.chunk_pixels, tmx_map.height * TILE_SIZE - key[1] * self.chunk_pixels)
+		return pygame.Surface((width, height), pygame.SRCALPHA)
+
+	@staticmethod
+	def opaque(surf):
+		# convert_tile only keeps alpha or a colorkey on tiles that have see-through pixels
+		return surf.get_size() == (TILE_SIZE, TILE_SIZE) and not surf.get_flags() & pygame.SRCALPHA and surf.get_colorkey() is None
+
+	def release(self):
+		self.chunks.clear()
+
+	def draw(self, surface, offset):
+		width, height = surface.get_size()
+		left, top = int(-offset.x // self.chunk_pixels), int(-offset.y // self.chunk_pixels)
+		right, bottom = int((width - offset.x) // self.chunk_pixels), int((height - offset.y) // self.chunk_pixels)
+		for cy in range(top, bottom + 1):
+			for cx in range(left, right + 1):
+				chunk = self.chunks.get((cx, cy))
+				if chunk:
+					surface.blit(chunk, (cx * self.chunk_pixels + offset.x, cy * self.chunk_pixels + offset.y))
@@ -0,0 +1,64 @@
+from settings import *
+from spatial import SpatialHash
+
+class TriggerZone:
+	def __init__(self, sprite, order, on_enter, on_stay, on_exit):
+		self.sprite = sprite
+		self.order = order
+		self.on_enter = on_enter
+		self.on_stay = on_stay
+		self.on_exit = on_exit
+
+class TriggerZones:
+	# zone rects hashed by tile, the player hitbox is only tested against the zones in its cells
+	def __init__(self, cell_size = TILE_SIZE):
+		self.spatial_hash = SpatialHash(cell_size)
+		self.zones = {}
+		self.cells = None
+		self.candidates = []
+		self.last_rect = None
+		self.inside = {}
+
+	def add(self, sprite, on_enter = None, on_stay = None, on_exit = None):
+		self.zones[sprite] = TriggerZone(sprite, len(self.zones), on_enter, on_stay, on_exit)
+		self.spatial_hash.insert(sprite, sprite.rect)
+		self.cells = None
+
+	def clear(self):
+		self.spatial_hash.clear()
+		self.zones.clear()
+		self.reset()
+
+	def reset(self):
+		# forget where the player was, the next update fires enter for every zone it stands in
+		self.inside.clear()
+		self.cells, self.candidates, self.last_rect = None, [], None
+
+	def touching(self, group):
+		return [sprite for sprite in self.inside if sprite in group]
+
+	def update(self, rect):
+		# the candidate list only changes when the hitbox reaches other cells,
+		# the exact test only runs when it moved at all
+		cells = self.spatial_hash.cell_range(rect.inflate(2, 2))
+		if cells != self.cells:
+			self.cells = cells
+			zones = self.spatial_hash.query(rect.inflate(2, 2))
+			self.candidates = sorted(zones, key = lambda sprite: self.zones[sprite].order)
+
+		if tuple(rect) != self.last_rect:
+			self.last_rect = tuple(rect)
+			inside = {sprite: None for sprite in self.candidates if sprite.rect.colliderect(rect)}
+		else:
+			inside = self.inside
+
+		previous, self.inside = self.inside, inside
+		for sprite in [sprite for sprite in previous if sprite not in inside]:
+			zone = self.zones[sprite]
+			if zone.on_exit: zone.on_exit(sprite)
+		for sprite in list(inside):
+			zone = self.zones[sprite]
+			if sprite not in previous:
+				if zone.on_enter: zone.on_enter(sprite)
+			elif zone.on_stay:
+				zone.on_stay(sprite)